@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
+import os
 import re
 from pathlib import Path
 from io import BytesIO
 import tempfile
 
-from src.parser import parse_pdf
+from src.parser import parse_pdfs_cached
 from src.processor import build_outputs
 from src.exporters import dfs_to_excel_bytes, df_to_template_excel_bytes
 
@@ -13,6 +14,9 @@ from src.exporters import dfs_to_excel_bytes, df_to_template_excel_bytes
 HERE = Path(__file__).parent
 LOGO = HERE / "aie-logo.png"
 FAVICON = HERE / "aiefavicon.ico"
+# Cache en disco de PDFs parseados: desactivado salvo que se configure PARSER_CACHE_DIR
+# (guarda CUITs, nombres e importes de los comprobantes; ver README)
+PARSER_CACHE = os.environ.get("PARSER_CACHE_DIR") or None
 
 st.set_page_config(
     page_title="Liquidaciones de Hacienda (ARCA) → Compras / Ventas",
@@ -139,6 +143,7 @@ def _parse_uploaded(files, role_label: str):
         return
 
     local_hashes = set()  # dedupe SOLO dentro de esta tanda de subida (UX)
+    entradas = []  # (archivo, hash, ruta tmp o None si ya está parseado en sesión), en orden de subida
     for uf in files:
         raw = uf.getvalue()
         h = _file_sha256(raw)
@@ -148,8 +153,22 @@ def _parse_uploaded(files, role_label: str):
             continue
         local_hashes.add(h)
 
-        # Si ya está parseado en sesión, lo reutilizamos (no warning, no re-parse)
         if h in st.session_state.parsed_by_hash[role_label]:
+            entradas.append((uf, h, None))
+            continue
+
+        # Guardar en tmp por hash (dos PDFs con el mismo nombre no se pisan);
+        # los nuevos se parsean todos juntos (en paralelo si son muchos)
+        tmp_path = tmp_dir / f"{h}.pdf"
+        tmp_path.write_bytes(raw)
+        entradas.append((uf, h, tmp_path))
+
+    parsed = iter(parse_pdfs_cached(
+        [str(p) for _, _, p in entradas if p is not None], cache_dir=PARSER_CACHE
+    ))
+    for uf, h, tmp_path in entradas:
+        # Si ya está parseado en sesión, lo reutilizamos (no warning, no re-parse)
+        if tmp_path is None:
             doc = st.session_state.parsed_by_hash[role_label][h]
             # Ajusto filename para que coincida con lo que el usuario ve
             try:
@@ -160,31 +179,28 @@ def _parse_uploaded(files, role_label: str):
             roles[uf.name] = role_label
             continue
 
-        # Guardar en tmp y parsear
-        tmp_path = tmp_dir / uf.name
-        tmp_path.write_bytes(raw)
+        doc = next(parsed)
+        if isinstance(doc, Exception):
+            st.error(f"No pude leer {uf.name}: {doc}")
+            continue
         try:
-            doc = parse_pdf(str(tmp_path))
-            try:
-                doc.filename = uf.name
-            except Exception:
-                pass
-
-            doc_id = _doc_fingerprint(doc)
-            if doc_id in st.session_state.seen_doc_ids[role_label]:
-                # Ya existe un comprobante igual (aunque el PDF sea distinto)
-                st.warning(f"Comprobante ya procesado ({role_label}): {uf.name}")
-                # Igual cacheamos por hash para no re-parsear en reruns
-                st.session_state.parsed_by_hash[role_label][h] = doc
-                continue
+            doc.filename = uf.name
+        except Exception:
+            pass
 
-            st.session_state.seen_doc_ids[role_label].add(doc_id)
+        doc_id = _doc_fingerprint(doc)
+        if doc_id in st.session_state.seen_doc_ids[role_label]:
+            # Ya existe un comprobante igual (aunque el PDF sea distinto)
+            st.warning(f"Comprobante ya procesado ({role_label}): {uf.name}")
+            # Igual cacheamos por hash para no re-parsear en reruns
             st.session_state.parsed_by_hash[role_label][h] = doc
+            continue
 
-            docs.append(doc)
-            roles[uf.name] = role_label
-        except Exception as e:
-            st.error(f"No pude leer {uf.name}: {e}")
+        st.session_state.seen_doc_ids[role_label].add(doc_id)
+        st.session_state.parsed_by_hash[role_label][h] = doc
+
+        docs.append(doc)
+        roles[uf.name] = role_label
 
 _parse_uploaded(uploaded_emisor, "EMISOR")
 _parse_uploaded(uploaded_receptor, "RECEPTOR")
@@ -1,11 +1,33 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Iterator, List, Optional, Dict, Any, Tuple, Union
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
 import re
+import time
+import numpy as np
 import pdfplumber
+from pdfminer.psparser import PSException
+from pdfplumber.utils.exceptions import PdfminerException
 
-from .rules import detectar_ajuste, tipo_interno_por_cod, condicion_iva_abreviar
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pdfplumber sigue disponible como backend de texto
+    pdfium = None
+
+from .rules import Ajuste, detectar_ajuste, tipo_interno_por_ajuste, condicion_iva_abreviar
+
+logger = logging.getLogger(__name__)
+
+# Subir cuando cambie la lógica de parseo o los campos de ParsedDoc: invalida los resultados cacheados en disco
+_PARSER_VERSION = 9
 
 
 def normalize_text(txt: str) -> str:
@@ -50,14 +72,16 @@ def parse_int(s: str) -> Optional[int]:
         return None
 
 
+_RE_MONEY_TOKEN = re.compile(r"\b\d[\d,]*\.\d{2,3}\b")
+_ALICUOTAS_EXCL = frozenset({"10.50", "21.00", "27.00", "0.00"})
+
+
 def money_tokens(line: str) -> List[str]:
     """
     Devuelve importes monetarios tipo 1,234.56 o 950.00.
     Excluye alícuotas típicas (10.50, 21.00, 27.00, 0.00) cuando aparecen en la línea.
     """
-    toks = re.findall(r"\b\d[\d,]*\.\d{2,3}\b", line)
-    excl = {"10.50", "21.00", "27.00", "0.00"}
-    return [t for t in toks if t not in excl]
+    return [t for t in _RE_MONEY_TOKEN.findall(line) if t not in _ALICUOTAS_EXCL]
 
 
 def _find_one(pattern: str, text: str, group: int = 1, flags=re.IGNORECASE) -> str:
@@ -65,7 +89,45 @@ def _find_one(pattern: str, text: str, group: int = 1, flags=re.IGNORECASE) -> s
     return m.group(group).strip() if m else ""
 
 
-@dataclass
+def _lower(text: str) -> Optional[str]:
+    """`text.lower()` si conserva las posiciones de `text`; si no, None (`_find_span` va por regex).
+
+    Se calcula una vez por documento y se pasa a los parsers que buscan rótulos.
+    """
+    low = text.lower()
+    return low if len(low) == len(text) else None
+
+
+def _find_span(
+    text: str,
+    low: Optional[str],
+    prefijo: str,
+    pattern: re.Pattern,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Optional[Tuple[int, int]]:
+    """Primer match de `pattern` (`re.IGNORECASE`) en `text[start:end]`, sin correr el regex sobre todo el texto.
+
+    `prefijo` es el comienzo en minúsculas de todo match posible (p.ej. "categor" para
+    `Categor[ií]a\\s*/\\s*Raza`): se ubican sus apariciones con `str.find` sobre `low`
+    (`_lower(text)`) y el regex sólo se prueba en esas posiciones, así que el resultado es el
+    mismo que `pattern.search(text, start, end)`.
+    """
+    if end is None:
+        end = len(text)
+    if low is None:
+        m = pattern.search(text, start, end)
+        return m.span() if m else None
+    i = low.find(prefijo, start, end)
+    while i != -1:
+        m = pattern.match(text, i, end)
+        if m:
+            return m.span()
+        i = low.find(prefijo, i + 1, end)
+    return None
+
+
+@dataclass(slots=True, frozen=True)
 class Party:
     cuit: str = ""
     nombre: str = ""
@@ -83,7 +145,7 @@ class Party:
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ItemHacienda:
     categoria: str
     cabezas: float
@@ -95,7 +157,7 @@ class ItemHacienda:
     iva_importe: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Gasto:
     concepto: str
     base: Optional[float]
@@ -105,7 +167,7 @@ class Gasto:
     iva_importe: Optional[float]
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedDoc:
     filename: str
     cod_arca: int
@@ -125,33 +187,126 @@ class ParsedDoc:
     total_gastos: float
     iva_gastos: float
     importe_neto: float
-    retenciones: List[Tuple[str, float]]
     # Detalle
     items: List[ItemHacienda]
     gastos: List[Gasto]
+    retenciones: List[Tuple[str, float]] = field(default_factory=list)
+
 
+def _opt_floats(values, n: int) -> np.ndarray:
+    # None -> NaN (iva_pct / iva_importe pueden faltar en el PDF)
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=n)
 
-def extract_full_text(pdf_path: str) -> str:
+
+def items_as_arrays(items: List[ItemHacienda]) -> Dict[str, np.ndarray]:
+    """Vista columnar (SoA) de los items para agregar con NumPy en vez de iterar dataclasses.
+
+    Usa float64: con importes de millones, float32 pierde los centavos.
+    Los campos opcionales ausentes quedan como NaN.
+    """
+    n = len(items)
+    return {
+        "cabezas": np.fromiter((it.cabezas for it in items), dtype=np.float64, count=n),
+        "kilos": np.fromiter((it.kilos for it in items), dtype=np.float64, count=n),
+        "precio": np.fromiter((it.precio for it in items), dtype=np.float64, count=n),
+        "bruto": np.fromiter((it.bruto for it in items), dtype=np.float64, count=n),
+        "iva_importe": _opt_floats((it.iva_importe for it in items), n),
+        "iva_pct": _opt_floats((it.iva_pct for it in items), n),
+        "categoria": np.array([it.categoria for it in items], dtype=object),
+        "um": np.array([it.um for it in items], dtype=object),
+    }
+
+
+def gastos_as_arrays(gastos: List[Gasto]) -> Dict[str, np.ndarray]:
+    """Vista columnar (SoA) de los gastos; mismo criterio que `items_as_arrays`."""
+    n = len(gastos)
+    return {
+        "importe": np.fromiter((g.importe for g in gastos), dtype=np.float64, count=n),
+        "iva_pct": _opt_floats((g.iva_pct for g in gastos), n),
+        "iva_importe": _opt_floats((g.iva_importe for g in gastos), n),
+        "concepto": np.array([g.concepto for g in gastos], dtype=object),
+    }
+
+
+def text_backend() -> str:
+    """Backend de extracción de texto según `PARSER_TEXT_BACKEND` (pdfplumber | pdfium).
+
+    Por defecto pdfplumber. pdfium es mucho más rápido para texto plano, pero arma el texto
+    distinto (espacios, orden de líneas) y todos los regex dependen de ese formato: antes de
+    usarlo conviene verificar los PDFs reales con `comparar_backends`.
+    """
+    backend = os.environ.get("PARSER_TEXT_BACKEND", "pdfplumber").strip().lower()
+    return "pdfium" if backend == "pdfium" and pdfium is not None else "pdfplumber"
+
+
+def _page_texts_pdfium(pdf_path: str, max_pages: Optional[int]) -> Iterator[str]:
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        n = len(pdf) if max_pages is None else min(len(pdf), max_pages)
+        for i in range(n):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                # pdfium separa líneas con CRLF; los parsers esperan "\n"
+                yield textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _page_texts_pdfplumber(pdf_path: str, max_pages: Optional[int]) -> Iterator[str]:
     with pdfplumber.open(pdf_path) as pdf:
-        parts = []
-        for p in pdf.pages:
-            parts.append(p.extract_text() or "")
+        pages = pdf.pages if max_pages is None else pdf.pages[:max_pages]
+        for p in pages:
+            yield p.extract_text() or ""
+
+
+def extract_full_text(
+    pdf_path: str, max_pages: Optional[int] = None, backend: Optional[str] = None
+) -> str:
+    """Extrae el texto página por página.
+
+    Corta apenas el texto leído ya contiene el bloque Receptor y el cierre "Importe Neto:";
+    las páginas siguientes no aportan datos a ningún parser. `max_pages` limita la lectura.
+    `backend` fuerza pdfium o pdfplumber; por defecto, `text_backend()`.
+    """
+    page_texts = (
+        _page_texts_pdfium(pdf_path, max_pages)
+        if (backend or text_backend()) == "pdfium"
+        else _page_texts_pdfplumber(pdf_path, max_pages)
+    )
+    parts: List[str] = []
+    has_receptor = has_neto = False
+    try:
+        for t in page_texts:
+            parts.append(t)
+            has_receptor = has_receptor or "Receptor" in t
+            has_neto = has_neto or "Importe Neto:" in t
+            if has_receptor and has_neto:
+                break
+    finally:
+        page_texts.close()
     return normalize_text("\n".join(parts))
 
 
-def parse_parties(text: str) -> Tuple[Party, Party]:
+_RE_RECEPTOR = re.compile(r"\bReceptor\b", re.IGNORECASE)
+_RE_FECHA_OPERACION = re.compile(r"Fecha Operaci[oó]n:", re.IGNORECASE)
+
+
+def parse_parties(text: str, low: Optional[str] = None) -> Tuple[Party, Party]:
     """
     Extrae EMISOR y RECEPTOR.
     En PDFs LSP/ARCA, el EMISOR suele figurar inmediatamente después de la línea "Cód. XXX"
     y antes de "Fecha ...", mientras que el RECEPTOR se encuentra en el bloque que inicia con "Receptor".
     """
-    emisor = Party()
-    receptor = Party()
-
     # --- Split por bloque Receptor ---
-    m_rec = re.search(r"\bReceptor\b", text, re.IGNORECASE)
-    emisor_block = text[: m_rec.start()] if m_rec else text
-    receptor_block = text[m_rec.start():] if m_rec else ""
+    if low is None:
+        low = _lower(text)
+    rec = _find_span(text, low, "receptor", _RE_RECEPTOR)
+    emisor_block = text[: rec[0]] if rec else text
+    receptor_block = text[rec[0]:] if rec else ""
 
     # --- Emisor ---
     lines = [ln.strip() for ln in emisor_block.splitlines() if ln.strip()]
@@ -186,21 +341,30 @@ def parse_parties(text: str) -> Tuple[Party, Party]:
     if not nombre:
         nombre = _find_one(r"(?:Raz[oó]n Social|Nombre y Apellido):\s*([A-Z0-9\.\-\sÁÉÍÓÚÑáéíóúñ]+?)(?:\n|CUIT:|Situaci|$)", emisor_block)
 
-    emisor.nombre = re.sub(r"\s+Fecha\b.*$", "", nombre.strip(), flags=re.IGNORECASE)
-    emisor.cuit = _find_one(r"CUIT:\s*([0-9]{11})", emisor_block)
-    emisor.iibb = _find_one(r"Ingresos Brutos:\s*([A-Z0-9\-\.\s]*)", emisor_block)
-    emisor.cond_iva_raw = _find_one(r"Condicion frente al IVA:\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\s]+)", emisor_block)
-    emisor.cond_iva = condicion_iva_abreviar(emisor.cond_iva_raw)
+    emisor_cond_raw = _find_one(r"Condicion frente al IVA:\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\s]+)", emisor_block)
+    emisor = Party(
+        cuit=_find_one(r"CUIT:\s*([0-9]{11})", emisor_block),
+        nombre=re.sub(r"\s+Fecha\b.*$", "", nombre.strip(), flags=re.IGNORECASE),
+        cond_iva_raw=emisor_cond_raw,
+        cond_iva=condicion_iva_abreviar(emisor_cond_raw),
+        iibb=_find_one(r"Ingresos Brutos:\s*([A-Z0-9\-\.\s]*)", emisor_block),
+    )
 
     # --- Receptor ---
-    m = re.search(r"Receptor(.*?)(Fecha Operaci[oó]n:|Fecha Operacion:)", receptor_block, re.IGNORECASE | re.DOTALL)
-    rb = m.group(1) if m else receptor_block
-
-    receptor.cuit = _find_one(r"CUIT:\s*([0-9]{11})", rb)
-    receptor.nombre = _find_one(r"(?:Nombre y Apellido|Raz[oó]n Social):\s*([A-Z0-9\.\-\sÁÉÍÓÚÑáéíóúñ]+?)(?:\n|CUIT:|Situaci|$)", rb, group=1)
-    receptor.cond_iva_raw = _find_one(r"(?:Situaci[oó]n IVA|Situación IVA):\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\s]+)", rb, group=1)
-    receptor.cond_iva = condicion_iva_abreviar(receptor.cond_iva_raw)
-    receptor.iibb = _find_one(r"N[°º] IIBB:\s*([A-Z0-9\-\.\s]*)", rb)
+    # El bloque arranca con "Receptor" y termina en "Fecha Operación:"
+    fo = None
+    if rec:
+        fo = _find_span(text, low, "fecha operaci", _RE_FECHA_OPERACION, start=rec[0] + len("Receptor"))
+    rb = text[rec[0] + len("Receptor"): fo[0]] if fo else receptor_block
+
+    receptor_cond_raw = _find_one(r"(?:Situaci[oó]n IVA|Situación IVA):\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\s]+)", rb, group=1)
+    receptor = Party(
+        cuit=_find_one(r"CUIT:\s*([0-9]{11})", rb),
+        nombre=_find_one(r"(?:Nombre y Apellido|Raz[oó]n Social):\s*([A-Z0-9\.\-\sÁÉÍÓÚÑáéíóúñ]+?)(?:\n|CUIT:|Situaci|$)", rb, group=1),
+        cond_iva_raw=receptor_cond_raw,
+        cond_iva=condicion_iva_abreviar(receptor_cond_raw),
+        iibb=_find_one(r"N[°º] IIBB:\s*([A-Z0-9\-\.\s]*)", rb),
+    )
 
     return emisor, receptor
 
@@ -233,133 +397,178 @@ def parse_header(text: str) -> Dict[str, str]:
 
 
 
+_RE_RETENCIONES = re.compile(
+    r"(?P<gan>Ret\.?\s*Gananc\w*\s*[:\-]?\s*\$?\s*(?P<gan_amt>[0-9\.,]+))"
+    r"|(?P<nac1>Ret\.?\s*Imp\.?\s*Nacion\w*\s*[:\-]?\s*\$?\s*(?P<nac1_amt>[0-9\.,]+))"
+    r"|(?P<nac2>Imp\.?\s*Nacion\w*\s*Ret\.?\s*[:\-]?\s*\$?\s*(?P<nac2_amt>[0-9\.,]+))",
+    re.IGNORECASE,
+)
+# Grupo del patrón -> concepto exportado (el orden define el orden de salida)
+_RETENCIONES_LABELS = {
+    "gan": "Ret. Ganancias",
+    "nac1": "Ret. Imp. Nacionales",
+    "nac2": "Ret. Imp. Nacionales",
+}
+
+
 def parse_retenciones(text: str) -> List[Tuple[str, float]]:
     """Busca retenciones/tributos relevantes para exportar en Ventas (Otros conceptos).
     Devuelve lista de (concepto, importe). Importes siempre positivos (signo se aplica en processor si corresponde).
     """
-    out: List[Tuple[str, float]] = []
-    patterns = [
-        (r"Ret\.?\s*Gananc\w*\s*[:\-]?\s*\$?\s*([0-9\.,]+)", "Ret. Ganancias"),
-        (r"Ret\.?\s*Imp\.?\s*Nacion\w*\s*[:\-]?\s*\$?\s*([0-9\.,]+)", "Ret. Imp. Nacionales"),
-        (r"Imp\.?\s*Nacion\w*\s*Ret\.?\s*[:\-]?\s*\$?\s*([0-9\.,]+)", "Ret. Imp. Nacionales"),
-    ]
-    for rgx, label in patterns:
-        for m in re.finditer(rgx, text, flags=re.IGNORECASE):
-            amt = parse_money(m.group(1)) or 0.0
-            if amt:
-                out.append((label, float(amt)))
-    # dedup (sum by label)
-    if out:
-        agg: Dict[str, float] = {}
-        for k, v in out:
-            agg[k] = agg.get(k, 0.0) + float(v)
-        out = [(k, v) for k, v in agg.items()]
-    return out
+    # Una sola pasada sobre el texto; se suma por concepto a medida que aparece
+    agg: Dict[str, float] = {}
+    for m in _RE_RETENCIONES.finditer(text):
+        grp = m.lastgroup
+        amt = parse_money(m.group(f"{grp}_amt")) or 0.0
+        if amt:
+            label = _RETENCIONES_LABELS[grp]
+            agg[label] = agg.get(label, 0.0) + float(amt)
+    return [(label, agg[label]) for label in dict.fromkeys(_RETENCIONES_LABELS.values()) if label in agg]
+
+_RE_TOTALES = {
+    key: re.compile(label + r"\s*\$?\s*([0-9][0-9,]*\.[0-9]{2})", re.IGNORECASE)
+    for key, label in (
+        ("importe_bruto", r"Importe Bruto:"),
+        ("iva_bruto", r"IVA s/Bruto:"),
+        ("total_gastos", r"Total Gastos:"),
+        ("iva_gastos", r"IVA s/Gastos:"),
+        ("importe_neto", r"Importe Neto:"),
+    )
+}
 
-def parse_totales(text: str) -> Dict[str, float]:
-    def money_after(label: str) -> float:
-        m = re.search(label + r"\s*\$?\s*([0-9][0-9,]*\.[0-9]{2})", text, re.IGNORECASE)
-        return parse_money(m.group(1)) if m else 0.0
 
+def parse_totales(text: str) -> Dict[str, float]:
     return {
-        "importe_bruto": money_after(r"Importe Bruto:"),
-        "iva_bruto": money_after(r"IVA s/Bruto:"),
-        "total_gastos": money_after(r"Total Gastos:"),
-        "iva_gastos": money_after(r"IVA s/Gastos:"),
-        "importe_neto": money_after(r"Importe Neto:"),
+        key: (parse_money(m.group(1)) if (m := rx.search(text)) else 0.0)
+        for key, rx in _RE_TOTALES.items()
     }
 
 
+# Todo lo que no es texto de categoría: prefijo CUIT de cliente, importes, enteros, UM y puntos
+# sueltos. Una sola pasada reemplaza la cadena de re.sub secuenciales.
+_RE_CATEGORY_SCRUB = re.compile(
+    r"^\s*\d{11}\s*-\s*"
+    r"|\b\d[\d,]*\.\d{2}\b"
+    r"|\b\d[\d,]*\b"
+    r"|\bKg\.?(?:\s*\b\d[\d,]*(?:\.\d{2})?\b)*\s*Vivo\b"  # "Kg. 1,234 Vivo": los números intercalados también se quitan
+    r"|\bCabeza\b"
+    r"|\bUN(?:ID(?:AD(?:ES)?)?)?\b"
+    r"|\s*\.\s*",
+    re.IGNORECASE,
+)
+_RE_MULTISPACE = re.compile(r"\s{2,}")
+
+
 def _text_only_category(line: str) -> str:
     # Quita importes monetarios y números sueltos, dejando texto/categoría
     # Elimina prefijos tipo '305041318889 - NOMBRE ...' (cliente) que aparecen en algunas cuentas de venta.
-    line = re.sub(r'^\s*\d{11}\s*-\s*', '', line)
-    t = re.sub(r"\b\d[\d,]*\.\d{2}\b", " ", line)  # importes
-    t = re.sub(r"\b\d[\d,]*\b", " ", t)  # enteros
-    t = re.sub(r"\bKg\.?\s*Vivo\b", " ", t, flags=re.IGNORECASE)
-    t = re.sub(r"\bCabeza\b", " ", t, flags=re.IGNORECASE)
-    t = re.sub(r"\bUN(?:ID(?:AD(?:ES)?)?)?\b", " ", t, flags=re.IGNORECASE)
-    t = re.sub(r"\s*\.\s*", " ", t)  # puntos sueltos por cortes de importes
-    t = re.sub(r"\s{2,}", " ", t).strip(" -/")
+    t = _RE_CATEGORY_SCRUB.sub(" ", line)
+    t = _RE_MULTISPACE.sub(" ", t).strip(" -/")
     return t.strip()
 
 
-def parse_items(text: str) -> List[ItemHacienda]:
+# Patrones del loop por línea de `parse_items`, compilados una sola vez al importar
+_RE_CATEGORIA_HDR = re.compile(r"Categor[ií]a\s*/\s*Raza", re.IGNORECASE)
+_RE_IMPORTE_BRUTO = re.compile(r"Importe Bruto:", re.IGNORECASE)
+_RE_GASTOS = re.compile(r"\bGastos\b", re.IGNORECASE)
+_RE_HAS_UM = re.compile(r"Kg\.?\s*Vivo|\bCabeza\b", re.IGNORECASE)
+_RE_ALPHA = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]")
+_RE_ALPHA_U = re.compile(r"[A-Za-zÁÉÍÓÚÜÑáéíóúüñ]")
+_RE_DIGIT = re.compile(r"\d")
+_RE_FIN_ITEMS = re.compile(r"^(Datos\s+Adicionales|VENCIMIENTO)\b", re.IGNORECASE)
+_RE_UM_KG = re.compile(r"Kg\.?\s*Vivo", re.IGNORECASE)
+_RE_UM_CABEZA = re.compile(r"\bCabeza\b", re.IGNORECASE)
+_RE_UM_UNIDAD = re.compile(r"\bUN(?:ID(?:AD(?:ES)?)?)?\b|\bUNIDADES?\b|\bUNIDAD\b", re.IGNORECASE)
+_RE_IVA_PCT = re.compile(r"\b(10\.50|21\.00|27\.00|0\.00)\b")
+_RE_KG_CAB_KILOS = re.compile(r"\s(\d{1,5})\s+Kg\.?\s*Vivo\s+(\d[\d,]*)", re.IGNORECASE)
+_RE_KG_CABEZAS = re.compile(r"\b(\d{1,5})\s+Kg\.?\s*Vivo\b", re.IGNORECASE)
+_RE_KG_KILOS = re.compile(r"Kg\.?\s*Vivo\s+(\d[\d,]*)", re.IGNORECASE)
+_RE_CABEZA_QTY = re.compile(r"\bCabeza\s+(\d[\d,]*)", re.IGNORECASE)
+_RE_UNIDAD_QTY = re.compile(r"\bUN(?:ID(?:AD(?:ES)?)?)?\b\s+(\d[\d,]*)", re.IGNORECASE)
+# Filtro anti-gastos: nunca incluir comisión/base imponible/IVA en items de hacienda
+_RE_NO_HACIENDA = re.compile(
+    r"\b(Comisi[oó]n|Gastos?|Base\s+Imponible|Alicuota|Al[ií]cuota|IVA\b|Importe\s+IVA)\b",
+    re.IGNORECASE,
+)
+
+
+def parse_items(text: str, low: Optional[str] = None) -> List[ItemHacienda]:
     items: List[ItemHacienda] = []
 
-    start = re.search(r"Categor[ií]a\s*/\s*Raza", text, re.IGNORECASE)
-    end = re.search(r"Importe Bruto:", text, re.IGNORECASE)
-    if not start or not end or end.start() <= start.end():
+    if low is None:
+        low = _lower(text)
+    start = _find_span(text, low, "categor", _RE_CATEGORIA_HDR)
+    end = _find_span(text, low, "importe bruto:", _RE_IMPORTE_BRUTO)
+    if not start or not end or end[0] <= start[1]:
         return items
 
     # El bloque de items termina antes de 'Gastos' (para evitar que entren comisión/base imponible como hacienda)
-    between = text[start.start(): end.start()]
-    g = re.search(r"\bGastos\b", between, re.IGNORECASE)
-    if g:
-        between = between[: g.start()]
-    block = between
+    g = _find_span(text, low, "gastos", _RE_GASTOS, start=start[0], end=end[0])
+    block = text[start[0]: g[0] if g else end[0]]
     lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
 
-    header_idx = next((i for i, ln in enumerate(lines) if re.search(r"Categor[ií]a\s*/\s*Raza", ln, re.IGNORECASE)), None)
+    header_idx = next((i for i, ln in enumerate(lines) if _RE_CATEGORIA_HDR.search(ln)), None)
     if header_idx is None:
         return items
 
     data_lines = lines[header_idx + 1:]
 
-    # Merge robusto: junta líneas cuando la categoría/precio está en una línea y la UM en la siguiente
-    merged: List[str] = []
+    # Merge robusto: junta líneas cuando la categoría/precio está en una línea y la UM en la siguiente.
+    # Cada línea lógica se acumula como lista de fragmentos y se une una sola vez al final.
+    merged: List[List[str]] = []
     i = 0
     while i < len(data_lines):
         cur = data_lines[i]
         nxt = data_lines[i + 1] if i + 1 < len(data_lines) else ""
 
-        cur_has_um = bool(re.search(r"Kg\.?\s*Vivo|\bCabeza\b", cur, re.IGNORECASE))
-        nxt_has_um = bool(re.search(r"Kg\.?\s*Vivo|\bCabeza\b", nxt, re.IGNORECASE))
+        cur_has_um = bool(_RE_HAS_UM.search(cur))
+        nxt_has_um = bool(_RE_HAS_UM.search(nxt))
 
         if (not cur_has_um) and nxt_has_um:
-            combined = f"{cur} {nxt}".strip()
+            combined = [cur, nxt]
             i += 2
             # tercera línea de texto (raza/categoría) sin importes, ej: "Brangus 0"
             if i < len(data_lines):
                 third = data_lines[i]
-                if (len(money_tokens(third)) == 0) and re.search(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]", third):
-                    combined = f"{combined} {third}".strip()
+                if (len(money_tokens(third)) == 0) and _RE_ALPHA.search(third):
+                    combined.append(third)
                     i += 1
             merged.append(combined)
             continue
 
         # fallback: si la línea es muy corta (pocos números), pegarla con la anterior
         if merged:
-            digits = re.findall(r"\d", cur)
+            digits = _RE_DIGIT.findall(cur)
             if len(digits) < 3 and len(money_tokens(cur)) == 0:
-                merged[-1] = f"{merged[-1]} {cur}".strip()
+                merged[-1].append(cur)
                 i += 1
                 continue
 
         # Si la línea siguiente parece continuar la categoría (texto) sin importes, la anexamos
+        pieces = [cur]
         if i + 1 < len(data_lines):
             nxt = data_lines[i + 1].strip()
-            if nxt and re.search(r"[A-Za-zÁÉÍÓÚÜÑáéíóúüñ]", nxt) and len(money_tokens(nxt)) == 0:
-                if len(money_tokens(cur)) > 0 and not re.search(r"^(Datos\s+Adicionales|VENCIMIENTO)\b", nxt, re.IGNORECASE):
-                    cur = f"{cur} {nxt}".strip()
+            if nxt and _RE_ALPHA_U.search(nxt) and len(money_tokens(nxt)) == 0:
+                if len(money_tokens(cur)) > 0 and not _RE_FIN_ITEMS.search(nxt):
+                    pieces.append(nxt)
                     i += 1
 
-        merged.append(cur)
+        merged.append(pieces)
         i += 1
 
-    for ln in merged:
+    for ln in (" ".join(pieces) for pieces in merged):
         # Detectar UM
         um = ""
-        if re.search(r"Kg\.?\s*Vivo", ln, re.IGNORECASE):
+        if _RE_UM_KG.search(ln):
             um = "Kg Vivo"
-        elif re.search(r"\bCabeza\b", ln, re.IGNORECASE):
+        elif _RE_UM_CABEZA.search(ln):
             um = "Cabeza"
-        elif re.search(r"\bUN(?:ID(?:AD(?:ES)?)?)?\b|\bUNIDADES?\b|\bUNIDAD\b", ln, re.IGNORECASE):
+        elif _RE_UM_UNIDAD.search(ln):
             um = "Unidad"
 
         # IVA pct
         iva_pct = None
-        m_pct = re.search(r"\b(10\.50|21\.00|27\.00|0\.00)\b", ln)
+        m_pct = _RE_IVA_PCT.search(ln)
         if m_pct:
             iva_pct = float(m_pct.group(1))
 
@@ -399,26 +608,26 @@ def parse_items(text: str) -> List[ItemHacienda]:
         kilos = 0.0
 
         if um.lower().startswith("kg"):
-            m = re.search(r"\s(\d{1,5})\s+Kg\.?\s*Vivo\s+(\d[\d,]*)", ln, re.IGNORECASE)
+            m = _RE_KG_CAB_KILOS.search(ln)
             if m:
                 cabezas = float(parse_int(m.group(1)) or 0)
                 kilos = float(parse_int(m.group(2)) or 0)
             else:
-                m2 = re.search(r"\b(\d{1,5})\s+Kg\.?\s*Vivo\b", ln, re.IGNORECASE)
+                m2 = _RE_KG_CABEZAS.search(ln)
                 if m2:
                     cabezas = float(parse_int(m2.group(1)) or 0)
-                m3 = re.search(r"Kg\.?\s*Vivo\s+(\d[\d,]*)", ln, re.IGNORECASE)
+                m3 = _RE_KG_KILOS.search(ln)
                 if m3:
                     kilos = float(parse_int(m3.group(1)) or 0)
 
         elif um.lower().startswith("cabeza"):
-            m = re.search(r"\bCabeza\s+(\d[\d,]*)", ln, re.IGNORECASE)
+            m = _RE_CABEZA_QTY.search(ln)
             if m:
                 cabezas = float(parse_int(m.group(1)) or 0)
             kilos = 0.0
 
         elif um.lower().startswith("unidad"):
-            m = re.search(r"\bUN(?:ID(?:AD(?:ES)?)?)?\b\s+(\d[\d,]*)", ln, re.IGNORECASE)
+            m = _RE_UNIDAD_QTY.search(ln)
             if m:
                 cabezas = float(parse_int(m.group(1)) or 0)
             kilos = 0.0
@@ -434,7 +643,7 @@ def parse_items(text: str) -> List[ItemHacienda]:
             continue
 
         # Filtro anti-gastos: nunca incluir comisión/base imponible/IVA en items de hacienda
-        if re.search(r"\b(Comisi[oó]n|Gastos?|Base\s+Imponible|Alicuota|Al[ií]cuota|IVA\b|Importe\s+IVA)\b", categoria, re.IGNORECASE):
+        if _RE_NO_HACIENDA.search(categoria):
             continue
 
         items.append(
@@ -454,24 +663,26 @@ def parse_items(text: str) -> List[ItemHacienda]:
 
 
 
-def parse_items_from_pdf(pdf_path: str) -> List[ItemHacienda]:
-    """Extrae el detalle de animales desde la tabla del PDF usando pdfplumber.
+def _cell(row: List[Optional[str]], idx: Optional[int]) -> str:
+    """Celda de una fila de tabla pdfplumber, "" si la columna no existe en esa fila."""
+    if idx is None or idx >= len(row):
+        return ""
+    return (row[idx] or "").strip()
 
-    Esta vía es la más confiable porque respeta columnas (evita mezclar 'Cliente' con 'Categoría/Raza').
-    Si no se encuentra la tabla, devuelve [] y el caller puede usar el fallback por texto.
-    """
-    items: List[ItemHacienda] = []
+
+def _find_items_table(pdf_path: str) -> Optional[List[List[Optional[str]]]]:
+    """Busca en las 2 primeras páginas la tabla con encabezado 'Categoría/Raza' más completa."""
+    best_table = None
+    best_score = -1
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            best_table = None
-            best_score = -1
             for page in pdf.pages[:2]:
                 for t in page.extract_tables() or []:
                     if not t or not t[0]:
                         continue
                     header = [(c or "").strip() for c in t[0]]
                     header_join = " | ".join(header)
-                    if not re.search(r"Categor[ií]a\s*/\s*Raza", header_join, re.IGNORECASE):
+                    if not _RE_CATEGORIA_HDR.search(header_join):
                         continue
                     score = sum(
                         1
@@ -486,105 +697,103 @@ def parse_items_from_pdf(pdf_path: str) -> List[ItemHacienda]:
                     if score > best_score:
                         best_score = score
                         best_table = t
+    except (PdfminerException, PSException, OSError) as e:
+        logger.warning("No se pudo leer la tabla de items de %s: %s", pdf_path, e)
+        return None
+    return best_table
 
-            if not best_table:
-                return items
-
-            header = [(c or "").strip() for c in best_table[0]]
-
-            def idx_of(patterns):
-                for i, h in enumerate(header):
-                    for p in patterns:
-                        if re.search(p, h, re.IGNORECASE):
-                            return i
-                return None
-
-            idx_categoria = idx_of([r"Categor[ií]a\s*/\s*Raza"])
-            idx_cabezas = idx_of([r"\bCabezas\b"])
-            idx_um = idx_of([r"\bUM\b"])
-            idx_cantidad = idx_of([r"\bCantidad\b"])
-            idx_precio = idx_of([r"\$\s*UM", r"\$\s*U\.?M\.?"])
-            idx_bruto = idx_of([r"\$\s*Bruto", r"\bBruto\b"])
-            idx_iva_pct = idx_of([r"%\s*IVA", r"\bIVA\b\s*%"])
-            idx_iva_imp = idx_of([r"\$\s*IVA"])
-
-            if idx_categoria is None or idx_cabezas is None or idx_um is None or idx_bruto is None:
-                return items
-
-            for row in best_table[1:]:
-                if not row or idx_categoria >= len(row):
-                    continue
-                cat_raw = (row[idx_categoria] or "").strip()
-                if not cat_raw:
-                    continue
-
-                categoria = re.sub(r"\s+", " ", cat_raw).strip()
-                categoria = re.sub(r"^\s*\d{11}\s*-\s*", "", categoria).strip()
-
-                if re.search(
-                    r"\b(Comisi[oó]n|Gastos?|Base\s+Imponible|Alicuota|Al[ií]cuota|IVA\b|Importe\s+IVA)\b",
-                    categoria,
-                    re.IGNORECASE,
-                ):
-                    continue
-
-                cabezas = float(parse_int((row[idx_cabezas] or '').strip()) or 0)
-
-                um_raw = (row[idx_um] or "").strip()
-                um = re.sub(r"\s+", " ", um_raw).strip()
-                um = um.replace("Kg.", "Kg").replace("Kgs", "Kg")
-                if re.search(r"Kg\s*Vivo", um, re.IGNORECASE):
-                    um = "Kg Vivo"
-                elif re.search(r"\bCabeza\b", um, re.IGNORECASE):
-                    um = "Cabeza"
-                elif re.search(r"\bUN\b|Unidad|Unidades", um, re.IGNORECASE):
-                    um = "Unidad"
-
-                kilos = 0.0
-                if idx_cantidad is not None and idx_cantidad < len(row):
-                    kilos = float(parse_int((row[idx_cantidad] or '').strip()) or 0)
-
-                precio = 0.0
-                if idx_precio is not None and idx_precio < len(row):
-                    precio = float(parse_money((row[idx_precio] or '').strip()) or 0.0)
-
-                bruto = float(parse_money((row[idx_bruto] or '').strip()) or 0.0)
-
-                iva_pct = None
-                if idx_iva_pct is not None and idx_iva_pct < len(row):
-                    s = (row[idx_iva_pct] or "").strip()
-                    if s:
-                        try:
-                            iva_pct = float(s.replace(",", "").replace("%", ""))
-                        except Exception:
-                            iva_pct = None
-
-                iva_imp = None
-                if idx_iva_imp is not None and idx_iva_imp < len(row):
-                    s = (row[idx_iva_imp] or "").strip()
-                    iva_imp = float(parse_money(s) or 0.0) if s else None
-
-                items.append(
-                    ItemHacienda(
-                        categoria=categoria,
-                        cabezas=cabezas,
-                        kilos=kilos,
-                        um=um,
-                        precio=precio,
-                        bruto=bruto,
-                        iva_pct=iva_pct,
-                        iva_importe=iva_imp,
-                    )
-                )
 
-    except Exception:
-        return []
+def parse_items_from_pdf(pdf_path: str) -> List[ItemHacienda]:
+    """Extrae el detalle de animales desde la tabla del PDF usando pdfplumber.
+
+    Esta vía es la más confiable porque respeta columnas (evita mezclar 'Cliente' con 'Categoría/Raza').
+    Si no se encuentra la tabla, devuelve [] y el caller puede usar el fallback por texto.
+    """
+    items: List[ItemHacienda] = []
+    best_table = _find_items_table(pdf_path)
+    if not best_table:
+        return items
+
+    header = [(c or "").strip() for c in best_table[0]]
+
+    def idx_of(patterns):
+        for i, h in enumerate(header):
+            for p in patterns:
+                if re.search(p, h, re.IGNORECASE):
+                    return i
+        return None
+
+    idx_categoria = idx_of([r"Categor[ií]a\s*/\s*Raza"])
+    idx_cabezas = idx_of([r"\bCabezas\b"])
+    idx_um = idx_of([r"\bUM\b"])
+    idx_cantidad = idx_of([r"\bCantidad\b"])
+    idx_precio = idx_of([r"\$\s*UM", r"\$\s*U\.?M\.?"])
+    idx_bruto = idx_of([r"\$\s*Bruto", r"\bBruto\b"])
+    idx_iva_pct = idx_of([r"%\s*IVA", r"\bIVA\b\s*%"])
+    idx_iva_imp = idx_of([r"\$\s*IVA"])
+
+    if idx_categoria is None or idx_cabezas is None or idx_um is None or idx_bruto is None:
+        return items
+
+    for row in best_table[1:]:
+        if not row:
+            continue
+        cat_raw = _cell(row, idx_categoria)
+        if not cat_raw:
+            continue
+
+        categoria = re.sub(r"\s+", " ", cat_raw).strip()
+        categoria = re.sub(r"^\s*\d{11}\s*-\s*", "", categoria).strip()
+
+        if _RE_NO_HACIENDA.search(categoria):
+            continue
+
+        cabezas = float(parse_int(_cell(row, idx_cabezas)) or 0)
+
+        um = re.sub(r"\s+", " ", _cell(row, idx_um)).strip()
+        um = um.replace("Kg.", "Kg").replace("Kgs", "Kg")
+        if re.search(r"Kg\s*Vivo", um, re.IGNORECASE):
+            um = "Kg Vivo"
+        elif re.search(r"\bCabeza\b", um, re.IGNORECASE):
+            um = "Cabeza"
+        elif re.search(r"\bUN\b|Unidad|Unidades", um, re.IGNORECASE):
+            um = "Unidad"
+
+        kilos = float(parse_int(_cell(row, idx_cantidad)) or 0)
+        precio = float(parse_money(_cell(row, idx_precio)) or 0.0)
+        bruto = float(parse_money(_cell(row, idx_bruto)) or 0.0)
+
+        # parse_money devuelve None si la celda no es numérica (antes: try/except sobre float)
+        iva_pct = parse_money(_cell(row, idx_iva_pct).replace("%", ""))
+
+        s = _cell(row, idx_iva_imp)
+        iva_imp = float(parse_money(s) or 0.0) if s else None
+
+        items.append(
+            ItemHacienda(
+                categoria=categoria,
+                cabezas=cabezas,
+                kilos=kilos,
+                um=um,
+                precio=precio,
+                bruto=bruto,
+                iva_pct=iva_pct,
+                iva_importe=iva_imp,
+            )
+        )
 
     return items
 
-def parse_gastos(text: str) -> List[Gasto]:
+_RE_GASTOS_BLOCK = re.compile(r"Gastos\s+.*?\n(.*?)\nImporte Bruto:", re.IGNORECASE | re.DOTALL)
+
+
+def parse_gastos(text: str, low: Optional[str] = None) -> List[Gasto]:
     gastos: List[Gasto] = []
-    m = re.search(r"Gastos\s+.*?\n(.*?)\nImporte Bruto:", text, re.IGNORECASE | re.DOTALL)
+    # El regex arranca desde el primer "gastos" (cualquier grafía) en vez de recorrer todo el encabezado
+    if low is None:
+        low = _lower(text)
+    first = low.find("gastos") if low is not None else -1
+    m = _RE_GASTOS_BLOCK.search(text, max(first, 0))
     if not m:
         return gastos
     block = m.group(1)
@@ -606,16 +815,61 @@ def parse_gastos(text: str) -> List[Gasto]:
     return gastos
 
 
-def parse_pdf(pdf_path: str) -> ParsedDoc:
-    text = extract_full_text(pdf_path)
+# Tolerancia relativa entre la suma de items y "Importe Bruto:" para aceptar la vía por texto
+_ITEMS_TOLERANCIA_BRUTO = 0.01
+
+
+def _categorias_texto_limpias(text: str, low: Optional[str] = None) -> bool:
+    """True si en el texto la tabla de items arranca en "Categoría/Raza" y no tiene columna Cliente.
+
+    Con otra columna antes de la categoría (o una columna Cliente en cualquier lugar),
+    `parse_items` pega el nombre del cliente a la categoría ("JUAN PEREZ Novillo"):
+    sólo la tabla del PDF separa bien esas columnas.
+    """
+    hdr = _find_span(text, _lower(text) if low is None else low, "categor", _RE_CATEGORIA_HDR)
+    if not hdr:
+        return False
+    ini = text.rfind("\n", 0, hdr[0]) + 1
+    fin = text.find("\n", hdr[1])
+    linea = text[ini: fin if fin != -1 else len(text)]
+    return not text[ini: hdr[0]].strip() and "cliente" not in linea.lower()
+
+
+def _items_cuadran(items: List[ItemHacienda], importe_bruto: float) -> bool:
+    """True si los items leídos del texto alcanzan para no extraer la tabla del PDF.
+
+    Es el control que permite saltear `parse_items_from_pdf`, así que sólo acepta lo que la
+    tabla daría igual: filas "Kg Vivo" con cabezas y kilos, cuyo precio × kilos da el bruto
+    (±1%), y brutos que suman "Importe Bruto:" (±1%). En filas "Cabeza"/"Unidad" la tabla
+    toma los kilos de la columna Cantidad y el texto no, así que esas siempre van por tabla.
+    """
+    if not items or not importe_bruto or importe_bruto <= 0:
+        return False
+    tol = _ITEMS_TOLERANCIA_BRUTO
+    for it in items:
+        if it.um != "Kg Vivo" or it.bruto <= 0 or it.cabezas <= 0 or it.kilos <= 0:
+            return False
+        if abs(it.precio * it.kilos - it.bruto) > tol * it.bruto:
+            return False
+    total = sum(it.bruto for it in items)
+    return abs(total - importe_bruto) <= tol * importe_bruto
+
+
+def parse_pdf(pdf_path: str, backend: Optional[str] = None) -> ParsedDoc:
+    text = extract_full_text(pdf_path, backend=backend)
     hdr = parse_header(text)
     cod_arca = int(hdr.get("cod_arca") or 0)
-    emisor, receptor = parse_parties(text)
+    low = _lower(text)  # una sola copia en minúsculas para ubicar rótulos
+    emisor, receptor = parse_parties(text, low)
     ajuste = detectar_ajuste(text)
-    tipo_interno = tipo_interno_por_cod(cod_arca, text)
+    tipo_interno = tipo_interno_por_ajuste(cod_arca, ajuste.es_ajuste and ajuste.sentido == "CREDITO")
     tot = parse_totales(text)
-    items = parse_items_from_pdf(pdf_path) or parse_items(text)
-    gastos = parse_gastos(text)
+    # La vía por texto es barata; si sus categorías vienen limpias y sus importes cierran contra
+    # "Importe Bruto" evitamos reabrir el PDF para extraer tablas (lo más costoso de pdfplumber).
+    items = parse_items(text, low)
+    if not (_categorias_texto_limpias(text, low) and _items_cuadran(items, tot["importe_bruto"])):
+        items = parse_items_from_pdf(pdf_path) or items
+    gastos = parse_gastos(text, low)
     retenciones = parse_retenciones(text)
 
     return ParsedDoc(
@@ -639,4 +893,151 @@ def parse_pdf(pdf_path: str) -> ParsedDoc:
         retenciones=retenciones,
         items=items,
         gastos=gastos,
-    )
\ No newline at end of file
+    )
+
+
+def comparar_backends(pdf_path: str) -> Dict[str, Tuple[Any, Any]]:
+    """Parsea `pdf_path` con pdfplumber y con pdfium y devuelve los campos que difieren.
+
+    `{campo: (pdfplumber, pdfium)}`; vacío si ambos backends dan el mismo `ParsedDoc`.
+    Es el control a correr sobre liquidaciones reales antes de pasar a `PARSER_TEXT_BACKEND=pdfium`.
+    """
+    if pdfium is None:
+        raise RuntimeError("pypdfium2 no está instalado")
+    a = parse_pdf(pdf_path, backend="pdfplumber")
+    b = parse_pdf(pdf_path, backend="pdfium")
+    return {
+        f.name: (getattr(a, f.name), getattr(b, f.name))
+        for f in fields(ParsedDoc)
+        if getattr(a, f.name) != getattr(b, f.name)
+    }
+
+
+# Cache en disco (opt-in): cuánto se guarda cada resultado y cuántos se guardan como máximo
+_CACHE_TTL_SEGUNDOS = 7 * 24 * 3600
+_CACHE_MAX_ENTRADAS = 500
+
+
+def _doc_to_json(doc: ParsedDoc) -> Dict[str, Any]:
+    d = asdict(doc)
+    d["ajuste"] = {"es_ajuste": doc.ajuste.es_ajuste, "sentido": doc.ajuste.sentido, "tipo": doc.ajuste.tipo}
+    return d
+
+
+def _doc_from_json(d: Dict[str, Any]) -> ParsedDoc:
+    return ParsedDoc(**{
+        **d,
+        "emisor": Party(**d["emisor"]),
+        "receptor": Party(**d["receptor"]),
+        "ajuste": Ajuste(**d["ajuste"]),
+        "items": [ItemHacienda(**it) for it in d["items"]],
+        "gastos": [Gasto(**g) for g in d["gastos"]],
+        "retenciones": [(lbl, amt) for lbl, amt in d["retenciones"]],
+    })
+
+
+def _podar_cache(cache_dir: Path) -> None:
+    """Borra las entradas vencidas (`_CACHE_TTL_SEGUNDOS`) y las más viejas por encima de `_CACHE_MAX_ENTRADAS`."""
+    try:
+        entradas = sorted(
+            ((f.stat().st_mtime, f) for f in cache_dir.iterdir() if f.is_file()), reverse=True
+        )
+    except OSError:
+        return
+    limite = time.time() - _CACHE_TTL_SEGUNDOS
+    for k, (mtime, f) in enumerate(entradas):
+        if k >= _CACHE_MAX_ENTRADAS or mtime < limite:
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+
+def parse_pdf_cached(pdf_path: str, cache_dir: Optional[str] = None) -> ParsedDoc:
+    """`parse_pdf` con cache opcional en disco por contenido del archivo.
+
+    Sin `cache_dir` no se guarda nada. Con `cache_dir`, la clave es (hash del PDF, `_PARSER_VERSION`,
+    backend de texto) y el resultado se guarda como JSON (incluye CUITs, nombres e importes);
+    las entradas se borran a los 7 días y se guardan a lo sumo 500. Si el cache no se puede leer
+    o escribir, se parsea normalmente.
+    """
+    if not cache_dir:
+        return parse_pdf(pdf_path)
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    h = hashlib.blake2b(data, digest_size=16).hexdigest()
+    p = Path(cache_dir) / f"{h}-{_PARSER_VERSION}-{text_backend()}.json"
+
+    if p.exists() and time.time() - p.stat().st_mtime < _CACHE_TTL_SEGUNDOS:
+        try:
+            doc = _doc_from_json(json.loads(p.read_text(encoding="utf-8")))
+        except (OSError, ValueError, KeyError, TypeError):
+            doc = None
+        if doc is not None:
+            doc.filename = pdf_path.split("/")[-1]
+            return doc
+
+    doc = parse_pdf(pdf_path)
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: otro proceso del pool nunca lee un JSON a medio escribir
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(_doc_to_json(doc), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, p)
+    except OSError:
+        pass
+    _podar_cache(p.parent)
+    return doc
+
+
+# Desde cuántos PDFs conviene repartir el parseo en procesos (levantar el pool tiene su costo)
+_PARALLEL_MIN_PDFS = 8
+# Tope de procesos: cada uno carga pdfplumber/pdfminer y convive con el servidor de Streamlit
+_PARALLEL_MAX_WORKERS = 4
+
+
+def _parse_pdf_cached_safe(pdf_path: str, cache_dir: Optional[str]) -> Union[ParsedDoc, Exception]:
+    try:
+        return parse_pdf_cached(pdf_path, cache_dir=cache_dir)
+    except Exception as e:
+        return e
+
+
+def parse_pdfs_cached(
+    pdf_paths: List[str], cache_dir: Optional[str] = None, max_workers: Optional[int] = None
+) -> List[Union[ParsedDoc, Exception]]:
+    """`parse_pdf_cached` para varios PDFs; resultados en el mismo orden que `pdf_paths`.
+
+    Cada PDF se parsea sin estado compartido, así que con muchos archivos se reparten entre
+    procesos; con pocos (o un solo CPU) se parsean en serie. Un PDF que falla devuelve su
+    excepción en su posición en vez de cortar el lote.
+
+    Los procesos se crean con `spawn`: hacer fork del servidor (multi-hilo) puede dejar
+    locks tomados en los hijos. Si el pool se rompe igual, el lote se parsea en serie.
+    """
+    cpus = os.cpu_count() or 1
+    if len(pdf_paths) < _PARALLEL_MIN_PDFS or cpus < 2:
+        return [_parse_pdf_cached_safe(p, cache_dir) for p in pdf_paths]
+    workers = min(max_workers or cpus, cpus, _PARALLEL_MAX_WORKERS, len(pdf_paths))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            return list(pool.map(_parse_pdf_cached_safe, pdf_paths, [cache_dir] * len(pdf_paths)))
+    except BrokenProcessPool:
+        logger.warning("Pool de parseo caído; se parsean %d PDFs en serie", len(pdf_paths))
+        return [_parse_pdf_cached_safe(p, cache_dir) for p in pdf_paths]
+
+
+if __name__ == "__main__":
+    # python -m src.parser a.pdf b.pdf ...  → diferencias pdfplumber vs pdfium por documento
+    import sys
+
+    distintos = 0
+    for path in sys.argv[1:]:
+        diff = comparar_backends(path)
+        distintos += bool(diff)
+        print(f"{'DIFIERE' if diff else 'OK'}\t{path}")
+        for campo, (plumber, pdfium_val) in diff.items():
+            print(f"  {campo}:\n    pdfplumber: {plumber!r}\n    pdfium:     {pdfium_val!r}")
+    sys.exit(1 if distintos else 0)
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import asdict
-from typing import Dict, Any, List, Tuple
+from types import MappingProxyType
+import sys
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-from .parser import ParsedDoc, ItemHacienda, Gasto
-from .rules import Role, movimiento_por_regla
+try:
+    from numba import njit
+except ImportError:  # numba es opcional: sin él las sumas por item van por NumPy
+    njit = None
+
+from .parser import ParsedDoc, gastos_as_arrays, items_as_arrays
+from .rules import Role, movimiento_por_regla_vec
 
 
 # Columnas de salida (mismo formato que tus plantillas Holistor / ARCA)
@@ -62,10 +69,381 @@ RECIBIDOS_SALIDA_COLS = [
     "Total",
 ]
 
-def _pct_from_totales(importe_bruto: float, iva_bruto: float) -> float:
-    if importe_bruto and iva_bruto:
-        return round((iva_bruto / importe_bruto) * 100, 3)
-    return 0.0
+# Grillas de Ventas / Compras (una fila por comprobante)
+RESUMEN_COLS = [
+    "Fecha",
+    "Fecha Operación",
+    "Título",
+    "Tipo",
+    "Cód ARCA",
+    "Letra",
+    "PV",
+    "Número",
+    "Ajuste",
+    "Ajuste sentido",
+    "Ajuste tipo",
+    "Contraparte CUIT",
+    "Contraparte",
+    "Cond IVA",
+    "Categoría/Raza",
+    "Cabezas",
+    "Kilos",
+    "Neto Hacienda (sin gastos)",
+    "IVA Hacienda",
+    "Gastos (sin IVA)",
+    "IVA Gastos",
+]
+
+GASTOS_COLS = [
+    "Movimiento",
+    "Fecha",
+    "Tipo",
+    "Cód ARCA",
+    "PV",
+    "Número",
+    "Contraparte",
+    "Concepto",
+    "Importe (sin IVA)",
+    "IVA %",
+    "IVA $",
+]
+
+CTRL_DETALLE_COLS = [
+    "Tipo de Hacienda",
+    "UM",
+    "Precio ($ UM)",
+    "Cantidad (Cabezas)",
+    "Kilos",
+    "Monto Bruto (sin gastos)",
+]
+
+CTRL_RESUMEN_COLS = [
+    "Tipo de Hacienda",
+    "UM",
+    "Cantidad (Cabezas)",
+    "Kilos",
+    "Monto Bruto (sin gastos)",
+    "Precio ($ UM)",
+]
+
+LIBRO_VENTAS_COLS = [
+    "Fecha",
+    "Tipo",
+    "Cód ARCA",
+    "Letra",
+    "PV",
+    "Número",
+    "CUIT Cliente",
+    "Razón Social Cliente",
+    "Cond IVA",
+    "Neto 10.5",
+    "IVA 10.5",
+    "Neto 21",
+    "IVA 21",
+    "Exento",
+    "Total",
+]
+
+# Esquema fijo (columna -> dtype) de las salidas con formato de importación. Los montos y códigos
+# llevan tipo explícito; None = texto o columna mixta (""/número), que pandas infiere.
+EMITIDOS_SALIDA_SCHEMA: Mapping[str, Any] = MappingProxyType({
+    **dict.fromkeys(EMITIDOS_SALIDA_COLS),
+    **dict.fromkeys(("Concepto", "TD", "Tipo Cambio", "Cód"), np.int64),
+    **dict.fromkeys(("Neto", "IVA", "Ex/Ng", "Otros Conceptos", "Total"), np.float64),
+    "__bold__": np.bool_,
+})
+
+RECIBIDOS_SALIDA_SCHEMA: Mapping[str, Any] = MappingProxyType({
+    **dict.fromkeys(RECIBIDOS_SALIDA_COLS),
+    **dict.fromkeys(("TD", "Tipo de cambio", "Cód. Neto"), np.int64),
+    **dict.fromkeys(("IVA Débito", "Total"), np.float64),
+})
+
+
+def _frame_from_schema(schema: Mapping[str, Any], cols: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """DataFrame con las columnas y tipos de `schema`; sin `cols`, vacío."""
+    if cols is None:
+        return pd.DataFrame({c: np.empty(0, dtype=t or object) for c, t in schema.items()})
+    return pd.DataFrame({c: cols[c] if t is None else np.asarray(cols[c], dtype=t) for c, t in schema.items()})
+
+
+# Salidas sin comprobantes (build_outputs devuelve copias)
+_EMPTY_OUTPUTS: Dict[str, pd.DataFrame] = {
+    "ventas": pd.DataFrame(columns=RESUMEN_COLS),
+    "compras": pd.DataFrame(columns=RESUMEN_COLS),
+    "gastos": pd.DataFrame(columns=GASTOS_COLS),
+    "ctrl_ventas_detalle": pd.DataFrame(columns=CTRL_DETALLE_COLS),
+    "ctrl_ventas_resumen": pd.DataFrame(columns=CTRL_RESUMEN_COLS),
+    "ctrl_compras_detalle": pd.DataFrame(columns=CTRL_DETALLE_COLS),
+    "ctrl_compras_resumen": pd.DataFrame(columns=CTRL_RESUMEN_COLS),
+    "libro_ventas": pd.DataFrame(columns=LIBRO_VENTAS_COLS),
+    "ventas_salida": _frame_from_schema(EMITIDOS_SALIDA_SCHEMA),
+    "compras_gastos_salida": _frame_from_schema(RECIBIDOS_SALIDA_SCHEMA),
+}
+
+# Fila base de Recibidos Salida: columnas fijas ya cargadas, el resto vacío
+_RECIBIDOS_TEMPLATE: Mapping[str, Any] = MappingProxyType({
+    **dict.fromkeys(RECIBIDOS_SALIDA_COLS, ""),
+    "Moneda": "PES",
+    "TD": 80,
+    "Tipo de cambio": 1,
+    "IVA Débito": 0.0,
+})
+
+def _pct_from_totales_vec(importe: np.ndarray, iva: np.ndarray) -> np.ndarray:
+    """Alícuota (%) implícita por documento; 0.0 donde falta importe o IVA."""
+    # Sólo se divide donde hay importe e IVA: sin warnings ni inf/NaN que después descartar
+    pct = np.divide(iva, importe, out=np.zeros(importe.shape), where=(importe != 0.0) & (iva != 0.0))
+    pct *= 100
+    return np.round(pct, 3, out=pct)
+
+
+def _float_array(values: Iterable[Optional[float]], count: int) -> np.ndarray:
+    """Columna float64 con None -> 0.0 (el `x or 0.0` de cada campo, en una pasada)."""
+    arr = np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=count)
+    return np.nan_to_num(arr, copy=False, nan=0.0)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _docs_to_soa(docs: List[ParsedDoc], es_emisor: np.ndarray) -> Dict[str, np.ndarray]:
+    """Campos escalares de los comprobantes en arrays paralelos (posición = doc).
+    es_emisor: rol de carga por doc; la contraparte es el receptor si se subió como EMISOR."""
+    n = len(docs)
+
+    def _obj(values: Iterable[Any]) -> np.ndarray:
+        arr = np.empty(n, dtype=object)
+        arr[:] = list(values)
+        return arr
+
+    # Signo importes (crédito negativo, débito positivo).
+    # Para ajuste monetario (financiero), no tocamos cabezas/kilos, pero sí montos
+    s_m = np.fromiter((d.ajuste.signo_montos for d in docs), dtype=float, count=n)
+    afecta_h = np.fromiter((d.ajuste.afecta_cabezas_kilos for d in docs), dtype=bool, count=n)
+
+    soa = {
+        "fecha": _obj(d.fecha for d in docs),
+        "fecha_operacion": _obj(d.fecha_operacion for d in docs),
+        "titulo": _obj(d.titulo for d in docs),
+        "tipo_interno": _obj(d.tipo_interno for d in docs),
+        "cod_arca": np.array([d.cod_arca for d in docs]),
+        "letra": _obj(d.letra for d in docs),
+        "pv": _obj(d.pv for d in docs),
+        "numero": _obj(d.numero for d in docs),
+        "es_ajuste": np.fromiter((d.ajuste.es_ajuste for d in docs), dtype=bool, count=n),
+        "ajuste_sentido": _obj(d.ajuste.sentido or "" for d in docs),
+        "ajuste_tipo": _obj(d.ajuste.tipo or "" for d in docs),
+        "s_m": s_m,
+        "s_h": np.where(afecta_h, s_m, 1.0),
+        "bruto": _float_array((d.importe_bruto for d in docs), n),
+        "iva": _float_array((d.iva_bruto for d in docs), n),
+        "gastos": _float_array((d.total_gastos for d in docs), n),
+        "iva_gastos": _float_array((d.iva_gastos for d in docs), n),
+    }
+    # Contraparte (para grillas): por tu regla, depende SOLO del rol de carga.
+    # - Subido como EMISOR  => Contraparte = RECEPTOR
+    # - Subido como RECEPTOR => Contraparte = EMISOR
+    # Pocas contrapartes distintas: se internan los textos para que las grillas compartan
+    # un único str por valor en vez de una copia por comprobante.
+    for campo, attr in (("cp_cuit", "cuit"), ("cp_nombre", "nombre"), ("cp_condiva", "cond_iva")):
+        emisor = _obj(_intern(getattr(d.emisor, attr)) for d in docs)
+        receptor = _obj(_intern(getattr(d.receptor, attr)) for d in docs)
+        soa[campo] = np.where(es_emisor, receptor, emisor)
+    return soa
+
+
+def _reduce_items_loop(item_doc, n, cabezas, kilos, bruto, iva_imp, iva_pct, s_m, s_h, pct_fallback):
+    """Sumas por comprobante en una pasada plana sobre los items; item_doc[k] = doc del item k.
+    Devuelve (7, n): cabezas, kilos, neto 10.5, IVA 10.5, neto 21, IVA 21, exento.
+    """
+    out = np.zeros((7, n))
+    for k in range(item_doc.shape[0]):
+        i = item_doc[k]
+        out[0, i] += cabezas[k]
+        out[1, i] += kilos[k]
+        pct = iva_pct[k]
+        if np.isnan(pct):
+            pct = pct_fallback[i]
+        neto = bruto[k] * s_m[i]
+        iva = iva_imp[k] * s_m[i]
+        if pct >= 20:
+            out[4, i] += neto
+            out[5, i] += iva
+        elif pct > 0:
+            out[2, i] += neto
+            out[3, i] += iva
+        else:
+            out[6, i] += neto
+    for i in range(n):
+        out[0, i] *= s_h[i]
+        out[1, i] *= s_h[i]
+    return out
+
+
+_reduce_items_jit = njit(cache=True)(_reduce_items_loop) if njit is not None else None
+
+
+def _reduce_items_numpy(item_doc, n, cabezas, kilos, bruto, iva_imp, iva_pct, s_m, s_h, pct_fallback):
+    """Mismo resultado que _reduce_items_loop con bincount (sin numba)."""
+    # Cabezas/kilos por doc: suma en C con bincount (docs sin items quedan en 0)
+    cabezas_doc = np.bincount(item_doc, weights=cabezas, minlength=n)
+    kilos_doc = np.bincount(item_doc, weights=kilos, minlength=n)
+    # Libro: cada item se clasifica de antemano (0 = 10.5, 1 = 21, 2 = exento) y se suma
+    # por la clave combinada doc*3 + bucket; reshape => una fila por doc, una columna por bucket
+    pct = np.where(np.isnan(iva_pct), pct_fallback[item_doc], iva_pct)
+    clave = item_doc.astype(np.intp) * 3 + np.where(pct >= 20, 1, np.where(pct > 0, 0, 2))
+    neto = np.bincount(clave, weights=bruto * s_m[item_doc], minlength=3 * n).reshape(n, 3)
+    iva = np.bincount(clave, weights=iva_imp * s_m[item_doc], minlength=3 * n).reshape(n, 3)
+    return np.vstack([
+        cabezas_doc * s_h,
+        kilos_doc * s_h,
+        neto[:, 0],
+        iva[:, 0],
+        neto[:, 1],
+        iva[:, 1],
+        neto[:, 2],
+    ])
+
+
+# Tipos fijos de las columnas del detalle de control (evita la inferencia por columna)
+_CTRL_DETALLE_DTYPES: Mapping[str, Any] = MappingProxyType({
+    "Tipo de Hacienda": object,
+    "UM": object,
+    "Precio ($ UM)": np.float64,
+    "Cantidad (Cabezas)": np.int64,
+    "Kilos": np.float64,
+    "Monto Bruto (sin gastos)": np.float64,
+})
+
+
+def _ctrl_detail_arrays(cols: Mapping[str, Any]) -> Dict[str, Any]:
+    """Columnas del detalle de control como arrays tipados, listas para pd.DataFrame."""
+    return {c: np.asarray(v, dtype=_CTRL_DETALLE_DTYPES[c]) for c, v in cols.items()}
+
+
+def _ctrl_por_movimiento(
+    df_items: pd.DataFrame, mov_item: np.ndarray, movs: Tuple[str, ...] = ("VENTA", "COMPRA")
+) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Detalle y resumen del Control Hacienda para cada movimiento de `movs`, con un solo
+    groupby sobre los items de todos ellos. mov_item: movimiento del comprobante de cada item."""
+    en_ctrl = np.isin(mov_item, movs)
+    # Precio redondeado a centavos para contar precios distintos (1234.5 == 1234.50001)
+    items = df_items.loc[en_ctrl].assign(
+        _mov=mov_item[en_ctrl],
+        _precio_key=df_items["Precio ($ UM)"].to_numpy()[en_ctrl].round(2),
+    )
+    # sort=True: el resumen se exporta ordenado por (Tipo, UM), sin depender del orden de carga
+    g = items.groupby(["_mov", "Tipo de Hacienda", "UM"], sort=True, observed=True)
+    resumen = g.agg({
+        "Cantidad (Cabezas)": "sum",
+        "Kilos": "sum",
+        "Monto Bruto (sin gastos)": "sum",
+    })
+    # Precio sólo si es único dentro del grupo
+    resumen["Precio ($ UM)"] = g["Precio ($ UM)"].first().where(g["_precio_key"].nunique() <= 1, "")
+    resumen = resumen.reset_index()
+
+    # Cantidades siempre enteras; kilos, montos y precio a centavos
+    for _df in (items, resumen):
+        _df["Cantidad (Cabezas)"] = _df["Cantidad (Cabezas)"].round(0).astype("int64")
+        for _c in ("Kilos", "Monto Bruto (sin gastos)", "Precio ($ UM)"):
+            _df[_c] = pd.to_numeric(_df[_c], errors="coerce").round(2)
+
+    out: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+    for mov in movs:
+        detalle = items.loc[items["_mov"] == mov, CTRL_DETALLE_COLS].reset_index(drop=True)
+        if detalle.empty:
+            out[mov] = (detalle, pd.DataFrame(columns=CTRL_RESUMEN_COLS))
+            continue
+        out[mov] = (detalle, resumen.loc[resumen["_mov"] == mov, CTRL_RESUMEN_COLS].reset_index(drop=True))
+    return out
+
+
+def _mixta(valores: np.ndarray, vacio: np.ndarray) -> List[Any]:
+    """Columna mixta de Recibidos Salida: el valor, o "" donde `vacio`."""
+    out = valores.astype(object)
+    out[vacio] = ""
+    return out.tolist()
+
+
+def _recibidos_salida(
+    soa: Mapping[str, np.ndarray],
+    mov: np.ndarray,
+    neto_hac: np.ndarray,
+    iva_hac: np.ndarray,
+    alic_tot: np.ndarray,
+    gastos: np.ndarray,
+    iva_gastos: np.ndarray,
+    alic_gastos: np.ndarray,
+) -> pd.DataFrame:
+    """Compras/Gastos en formato "Recibidos Salida", por comprobante: la línea 525 (valor
+    hacienda, sólo COMPRA) y luego la 400 (gastos, también de ventas). Montos ya con signo."""
+    es_525 = (mov == "COMPRA") & (neto_hac != 0.0)
+    es_400 = gastos != 0.0
+    doc = np.concatenate([np.flatnonzero(es_525), np.flatnonzero(es_400)])
+    linea_400 = np.repeat([False, True], [np.count_nonzero(es_525), np.count_nonzero(es_400)])
+    orden = np.lexsort((linea_400, doc))
+    doc, linea_400 = doc[orden], linea_400[orden]
+    k = doc.shape[0]
+
+    base = np.where(linea_400, gastos[doc], neto_hac[doc])
+    iva = np.where(linea_400, iva_gastos[doc], iva_hac[doc])
+    alic = np.where(linea_400, alic_gastos[doc], alic_tot[doc])
+    mov_doc = mov[doc]
+    sin_iva = iva == 0.0
+    exento = linea_400 & sin_iva   # gasto exento => a Conceptos NG/EX (cód 400)
+    mt = ~linea_400 & sin_iva      # MT: neto con alícuota 0, sin IVA
+    # En VENTAS los gastos se exportan como ND/NC según el signo (según tu regla general).
+    # En COMPRAS (incluyendo ajustes de DÉBITO) se respeta el tipo original del comprobante (CD/LC/VC...).
+    gasto_venta = linea_400 & (mov_doc == "VENTA")
+
+    cols: Dict[str, Any] = {c: [v] * k for c, v in _RECIBIDOS_TEMPLATE.items()}
+    cols.update({
+        "Fecha dd/mm/aaaa": soa["fecha"][doc],
+        "Cpbte": np.where(gasto_venta, np.where(base >= 0, "ND", "NC"), soa["tipo_interno"][doc]).astype(object),
+        "Tipo": np.where(gasto_venta, "A", soa["letra"][doc]).astype(object),
+        "Suc.": soa["pv"][doc],
+        "Número": soa["numero"][doc],
+        "Movimiento": np.select(
+            [mt, gasto_venta, linea_400 & (mov_doc == "COMPRA"), linea_400],
+            ["COMPRA HACIENDA", "GASTO VENTA", "GASTO COMPRA", "GASTO"],
+            "",
+        ).astype(object),
+        "Razón Social o Denominación Cliente": soa["cp_nombre"][doc],
+        "CUIT": soa["cp_cuit"][doc],
+        "Cond Fisc": soa["cp_condiva"][doc],
+        "Cód. Neto": np.where(linea_400, 400, 525),
+        "Neto Gravado": _mixta(base, exento),
+        # 525 con IVA: alícuota de los totales, vacía si no se pudo calcular
+        "Alíc.": _mixta(np.where(mt, 0.0, alic), exento | (~linea_400 & ~mt & (alic == 0.0))),
+        "IVA Liquidado": _mixta(np.where(mt, 0.0, iva), exento),
+        "Cód. NG/EX": _mixta(np.full(k, 400), ~exento),
+        "Conceptos NG/EX": _mixta(base, ~exento),
+        "Total": np.where(sin_iva, base, base + iva),
+    })
+    return _frame_from_schema(RECIBIDOS_SALIDA_SCHEMA, cols)
+
+
+# Columnas de texto con pocos valores distintos (tipos, letras, condición IVA...):
+# se guardan como category (códigos + diccionario chico) en vez de un str por celda.
+_CATEGORY_COLS = ("Tipo", "Letra", "Moneda", "Movimiento", "Cond IVA", "Condición Fiscal", "Cond Fisc")
+
+
+# Códigos enteros chicos (141, 80, 1, cód. ARCA...): se bajan al entero más chico que los contiene.
+# Los importes quedan en float64: float32 no conserva centavos en montos de millones.
+_CODE_COLS = ("Concepto", "TD", "Tipo Cambio", "Tipo de cambio", "Cód", "Cód ARCA", "Cód. Neto")
+
+
+def _compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for col in _CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in _CODE_COLS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
 
 
 def build_outputs(docs: List[ParsedDoc], roles: Dict[str, Role]) -> Dict[str, pd.DataFrame]:
@@ -73,445 +451,215 @@ def build_outputs(docs: List[ParsedDoc], roles: Dict[str, Role]) -> Dict[str, pd
     Devuelve dataframes listos para UI y export.
     roles: dict filename -> 'EMISOR'/'RECEPTOR'
     """
-    ventas_rows: List[Dict[str, Any]] = []
-    compras_rows: List[Dict[str, Any]] = []
-    gastos_rows: List[Dict[str, Any]] = []
-    ctrl_v_detail: List[Dict[str, Any]] = []
-    ctrl_c_detail: List[Dict[str, Any]] = []
-    libro_ventas_rows: List[Dict[str, Any]] = []
-    ventas_salida_rows: List[Dict[str, Any]] = []
-    compras_gastos_salida_rows: List[Dict[str, Any]] = []
-
-    for d in docs:
-        role = roles.get(d.filename, "RECEPTOR")
-        mov = movimiento_por_regla(d.cod_arca, role)
-
-        # Signo importes (crédito negativo, débito positivo)
-        s_m = d.ajuste.signo_montos
-        afecta_hacienda = True  # por default, si hay items
-        # Para ajuste monetario (financiero), no tocamos cabezas/kilos, pero sí montos
-        s_h = s_m if d.ajuste.afecta_cabezas_kilos else 1
-
-        # Contraparte (para grillas): por tu regla, depende SOLO del rol de carga.
-        # - Subido como EMISOR  => Contraparte = RECEPTOR
-        # - Subido como RECEPTOR => Contraparte = EMISOR
-        contraparte = d.receptor if role == "EMISOR" else d.emisor
-
-        # Neto sin gastos (según tu regla): base hacienda = Importe Bruto (sin IVA, sin gastos)
-        neto_hacienda = (d.importe_bruto or 0.0) * s_m
-        iva_hacienda = (d.iva_bruto or 0.0) * s_m
-
-        # Resumen cabezas/kilos desde items (si corresponde)
-        cabezas = sum((it.cabezas or 0.0) for it in d.items) * (s_h)
-        kilos = sum((it.kilos or 0.0) for it in d.items) * (s_h)
-
-        resumen = {
-            "Fecha": d.fecha,
-            "Fecha Operación": d.fecha_operacion,
-            "Título": d.titulo,
-            "Tipo": d.tipo_interno,
-            "Cód ARCA": d.cod_arca,
-            "Letra": d.letra,
-            "PV": d.pv,
-            "Número": d.numero,
-            "Ajuste": "SI" if d.ajuste.es_ajuste else "NO",
-            "Ajuste sentido": d.ajuste.sentido or "",
-            "Ajuste tipo": d.ajuste.tipo or "",
-            "Contraparte CUIT": contraparte.cuit,
-            "Contraparte": contraparte.nombre,
-            "Cond IVA": contraparte.cond_iva,
-            "Categoría/Raza": ", ".join(sorted({(it.categoria or "").strip() for it in d.items if (it.categoria or "").strip()})) if d.items else "",
-            "Cabezas": cabezas,
-            "Kilos": kilos,
-            "Neto Hacienda (sin gastos)": neto_hacienda,
-            "IVA Hacienda": iva_hacienda,
-            "Gastos (sin IVA)": (d.total_gastos or 0.0) * s_m,
-            "IVA Gastos": (d.iva_gastos or 0.0) * s_m,
-        }
-
-        if mov == "VENTA":
-            ventas_rows.append(resumen)
-        elif mov == "COMPRA":
-            compras_rows.append(resumen)
-
-
-        # --- Ventas (formato "Emitidos Salida") ---
-        if mov == "VENTA":
-            # Alicuota por items o por totales
-            alic = 0.0
-            if d.items:
-                for it in d.items:
-                    if it.iva_pct is not None:
-                        alic = float(it.iva_pct)
-                        break
-            if not alic:
-                alic = float(_pct_from_totales(d.importe_bruto or 0.0, d.iva_bruto or 0.0))
-
-            neto_col = neto_hacienda
-            exng_col = 0.0
-            if (d.iva_bruto or 0.0) == 0.0:
-                # sin IVA => va como Ex/Ng
-                exng_col = neto_hacienda
-                neto_col = 0.0
-
-            ventas_salida_rows.append({
-                "Fecha Emisión": d.fecha,
-                "Fecha Recepción": d.fecha_operacion or d.fecha,
-                "Concepto": 141,
-                "Tipo": d.tipo_interno,
-                "Letra": d.letra,
-                "Punto de Venta": d.pv,
-                "Número Desde": d.numero,
-                "Número Hasta": d.numero,
-"Nro. Doc. Emisor": contraparte.cuit,
-                "Denominación Emisor": contraparte.nombre,
-                "Condición Fiscal": contraparte.cond_iva,
-                "TD": 80,
-                "Tipo Cambio": 1,
-                "Moneda": "PES",
-                "Alicuota": alic if alic else "",
-                "Cód": 141,
-                "Neto": neto_col,
-                "IVA": iva_hacienda,
-                "Ex/Ng": exng_col,
-                "Otros Conceptos": 0.0,
-                "Total": (neto_col or 0.0) + (iva_hacienda or 0.0) + (exng_col or 0.0),
-            })
-
-        
-            # Retenciones / Impuestos (fila adicional en Otros Conceptos, en positivo, en negrita)
-            for _lbl, _amt in (getattr(d, "retenciones", None) or []):
-                try:
-                    _v = float(_amt)
-                except Exception:
-                    _v = 0.0
-                if _v:
-                    ventas_salida_rows.append({
-                        "Fecha Emisión": d.fecha,
-                        "Fecha Recepción": d.fecha_operacion or d.fecha,
-                        "Concepto": 141,
-                        "Tipo": d.tipo_interno,
-                        "Letra": d.letra,
-                        "Punto de Venta": d.pv,
-                        "Número Desde": d.numero,
-                        "Número Hasta": d.numero,
-"Nro. Doc. Emisor": contraparte.cuit,
-                        "Denominación Emisor": contraparte.nombre,
-                        "Condición Fiscal": contraparte.cond_iva,
-                        "TD": 80,
-                        "Tipo Cambio": 1,
-                        "Moneda": "PES",
-                        "Alicuota": "",
-                        "Cód": 141,
-                        "Neto": 0.0,
-                        "IVA": 0.0,
-                        "Ex/Ng": 0.0,
-                        "Otros Conceptos": _v,
-                        "Total": _v,
-                        "__bold__": True,
-                    })
-# Gastos detalle
-        for g in d.gastos:
-            gastos_rows.append({
-                "Movimiento": mov,
-                "Fecha": d.fecha,
-                "Tipo": d.tipo_interno,
-                "Cód ARCA": d.cod_arca,
-                "PV": d.pv,
-                "Número": d.numero,
-                "Contraparte": contraparte.nombre,
-                "Concepto": g.concepto,
-                "Importe (sin IVA)": (g.importe or 0.0) * s_m,
-                "IVA %": g.iva_pct or "",
-                "IVA $": (g.iva_importe or 0.0) * s_m if g.iva_importe is not None else "",
-            })
-
-            
-
-
-
-        
-        # --- Compras/Gastos (formato "Recibidos Salida") ---
-        def _append_recibidos_row(*, fecha: str, cpbte: str, letra: str, suc: str, numero: str,
-                                  movimiento: str = "",
-                                  contraparte_nombre: str, contraparte_cuit: str, cond_fisc: str,
-                                  cod_neto: int | str, base: float,
-                                  iva_pct: float | str = "", iva_imp: float = 0.0,
-                                  cod_ngex: int | str = "", concepto_ngex: float | str = "",
-                                  force_neto_no_iva: bool = False,
-                                  force_exento: bool = False,
-                                  td: int = 80) -> None:
-            """Agrega una fila al Excel Recibidos/Salida (Compras/Gastos).
-            - `force_neto_no_iva`: para MT (Neto con alícuota 0, sin IVA) aun si `iva_imp` es 0.
-            - `force_exento`: para gastos exentos (monto en Conceptos NG/EX).
-            """
-            # Columnas calculadas
-            neto_gravado = ""
-            alic = ""
-            iva_liq = ""
-            cod_ng = ""
-            conc_ng = ""
-
-            if force_exento:
-                cod_ng = str(cod_ngex) if str(cod_ngex) else str(int(cod_neto))
-                conc_ng = base
-            else:
-                if (iva_imp or 0.0) != 0.0 or force_neto_no_iva:
-                    neto_gravado = base
-                    # alícuota 0 para MT
-                    if force_neto_no_iva and (iva_imp or 0.0) == 0.0:
-                        alic = 0.0
-                        iva_liq = 0.0
-                    else:
-                        alic = iva_pct if (iva_imp or 0.0) != 0.0 else ""
-                        iva_liq = iva_imp if (iva_imp or 0.0) != 0.0 else 0.0
-                else:
-                    cod_ng = str(cod_ngex) if str(cod_ngex) else ""
-                    conc_ng = concepto_ngex if concepto_ngex != "" else base
-
-            # Total
-            total = 0.0
-            for v in (neto_gravado, iva_liq, conc_ng):
-                if isinstance(v, (int, float)):
-                    total += float(v)
-
-            row = {
-                "Fecha dd/mm/aaaa": fecha,
-                "Cpbte": cpbte,
-                "Tipo": letra,
-                "Suc.": suc,
-                "Número": numero,
-                "Movimiento": movimiento,
-                "Razón Social o Denominación Cliente": contraparte_nombre,
-"CUIT": contraparte_cuit,
-                "Domicilio": "",
-                "C.P.": "",
-                "Pcia": "",
-                "Cond Fisc": cond_fisc,
-                "TD": td,
-                "Moneda": "PES",
-                "Tipo de cambio": 1,
-                "Cód. Neto": int(cod_neto) if str(int(cod_neto)).strip() else "",
-                "Neto Gravado": neto_gravado,
-                "Alíc.": alic,
-                "IVA Liquidado": iva_liq,
-                "IVA Débito": 0.0,
-                "Cód. NG/EX": int(cod_ng) if str(cod_ng).strip().isdigit() else (cod_ng if cod_ng else ""),
-                "Conceptos NG/EX": conc_ng,
-                "Cód. P/R": "",
-                "Perc./Ret.": "",
-                "Pcia P/R": "",
-                "Total": total,
-            }
-            compras_gastos_salida_rows.append(row)
-
-        # Línea 525 (valor hacienda) SOLO para comprobantes clasificados como COMPRA
-        if mov == "COMPRA":
-            base = neto_hacienda
-            iva_imp = iva_hacienda
-            alic = _pct_from_totales(d.importe_bruto or 0.0, d.iva_bruto or 0.0)
-            if base != 0.0:
-                if (iva_imp or 0.0) == 0.0:
-                    _append_recibidos_row(
-                        fecha=d.fecha,
-                        cpbte=d.tipo_interno,
-                        letra=d.letra,
-                        suc=d.pv,
-                        numero=d.numero,
-                        contraparte_nombre=contraparte.nombre,
-                        contraparte_cuit=contraparte.cuit,
-                        cond_fisc=contraparte.cond_iva,
-                                                cod_neto=525,
-                        base=base,
-                        iva_pct="",
-                        iva_imp=0.0,
-                        force_neto_no_iva=True,
-                        movimiento="COMPRA HACIENDA",
-                    )
-                else:
-                    _append_recibidos_row(
-                        fecha=d.fecha,
-                        cpbte=d.tipo_interno,
-                        letra=d.letra,
-                        suc=d.pv,
-                        numero=d.numero,
-                        contraparte_nombre=contraparte.nombre,
-                        contraparte_cuit=contraparte.cuit,
-                        cond_fisc=contraparte.cond_iva,
-                                                cod_neto=525,
-                        base=base,
-                        iva_pct=alic if alic else "",
-                        iva_imp=iva_imp,
-                    )
-
-        # Línea 400 (gastos) para compras y también incluir gastos de ventas (ND/NC según signo)
-        if (d.total_gastos or 0.0) != 0.0:
-            mov_label = "GASTO VENTA" if mov == "VENTA" else ("GASTO COMPRA" if mov == "COMPRA" else "GASTO")
-            base_g = (d.total_gastos or 0.0) * s_m
-            iva_g = (d.iva_gastos or 0.0) * s_m
-
-                        # En VENTAS los gastos se exportan como ND/NC según el signo.
-            # En COMPRAS (incluyendo ajustes de DÉBITO) se respeta el tipo original del comprobante (CD/LC/VC...).
-            if mov == "VENTA":
-                cpbte_g = "ND" if base_g >= 0 else "NC"
-                letra_g = "A"  # según tu regla general
-            else:
-                cpbte_g = d.tipo_interno
-                letra_g = d.letra
-  # según tu regla general
-            alic_g = round((iva_g / base_g) * 100, 3) if base_g and iva_g else 0.0
-
-            if (iva_g or 0.0) == 0.0:
-                # gasto exento => a Conceptos NG/EX (cód 400)
-                _append_recibidos_row(
-                    fecha=d.fecha,
-                    cpbte=cpbte_g,
-                    letra=letra_g,
-                    suc=d.pv,
-                    numero=d.numero,
-                    contraparte_nombre=contraparte.nombre,
-                    contraparte_cuit=contraparte.cuit,
-                    cond_fisc=contraparte.cond_iva,
-                    movimiento=mov_label,
-                    cod_neto=400,
-                    base=base_g,
-                    force_exento=True,
-                    cod_ngex=400,
-                    concepto_ngex=base_g,
-                )
-            else:
-                _append_recibidos_row(
-                    fecha=d.fecha,
-                    cpbte=cpbte_g,
-                    letra=letra_g,
-                    suc=d.pv,
-                    numero=d.numero,
-                    contraparte_nombre=contraparte.nombre,
-                    contraparte_cuit=contraparte.cuit,
-                    cond_fisc=contraparte.cond_iva,
-                    movimiento=mov_label,
-                    cod_neto=400,
-                    base=base_g,
-                    iva_pct=alic_g,
-                    iva_imp=iva_g,
-                )
-
-
-# Control hacienda: sólo si hay items; monto neto sin gastos = suma de bruto de items
-        if d.items:
-            for it in d.items:
-                row = {
-                    "Tipo de Hacienda": it.categoria,
-                    "UM": it.um,
-                    "Precio ($ UM)": float(it.precio or 0.0),
-                    "Cantidad (Cabezas)": int(round((it.cabezas or 0.0) * (s_h))),
-                    "Kilos": float(it.kilos or 0.0) * (s_h),
-                    "Monto Bruto (sin gastos)": float(it.bruto or 0.0) * (s_m),
-                }
-                if mov == "VENTA":
-                    ctrl_v_detail.append(row)
-                elif mov == "COMPRA":
-                    ctrl_c_detail.append(row)
-
-        # Libro IVA Ventas (solo VENTAS, sólo hacienda)
-        if mov == "VENTA":
-            # Determinar alícuota: por items o por totales
-            neto_105 = iva_105 = neto_21 = iva_21 = exento = 0.0
-
-            if d.items:
-                for it in d.items:
-                    neto = (it.bruto or 0.0) * s_m
-                    iva = (it.iva_importe or 0.0) * s_m if it.iva_importe is not None else 0.0
-                    pct = it.iva_pct
-                    if pct is None:
-                        # fallback por totales
-                        pct = _pct_from_totales(d.importe_bruto or 0.0, d.iva_bruto or 0.0)
-                    if pct >= 20:
-                        neto_21 += neto
-                        iva_21 += iva
-                    elif pct > 0:
-                        neto_105 += neto
-                        iva_105 += iva
-                    else:
-                        exento += neto
-            else:
-                # sin items: si hay neto hacienda 0, no carga
-                pass
-
-            total = neto_105 + iva_105 + neto_21 + iva_21 + exento
-            libro_ventas_rows.append({
-                "Fecha": d.fecha,
-                "Tipo": d.tipo_interno,
-                "Cód ARCA": d.cod_arca,
-                "Letra": d.letra,
-                "PV": d.pv,
-                "Número": d.numero,
-                "CUIT Cliente": contraparte.cuit,
-                "Razón Social Cliente": contraparte.nombre,
-                "Cond IVA": contraparte.cond_iva,
-                "Neto 10.5": round(neto_105, 2),
-                "IVA 10.5": round(iva_105, 2),
-                "Neto 21": round(neto_21, 2),
-                "IVA 21": round(iva_21, 2),
-                "Exento": round(exento, 2),
-                "Total": round(total, 2),
-            })
-
-    df_ventas = pd.DataFrame(ventas_rows)
-    df_compras = pd.DataFrame(compras_rows)
-    df_gastos = pd.DataFrame(gastos_rows)
-
-    # Control: pivote a resumen por tipo
-    def _ctrl(df_detail: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        if df_detail.empty:
-            return df_detail, df_detail
-        resumen = (
-            df_detail
-            .groupby(["Tipo de Hacienda","UM"], as_index=False)
-            .agg({
-                "Cantidad (Cabezas)": "sum",
-                "Kilos": "sum",
-                "Monto Bruto (sin gastos)": "sum",
-                "Precio ($ UM)": lambda s: s.iloc[0] if len(set([v for v in s if pd.notna(v)])) <= 1 else "",
-            })
-        )
-        # Cantidades siempre enteras
-        for _df in (df_detail, resumen):
-            if _df is None or _df.empty:
-                continue
-            if 'Cantidad (Cabezas)' in _df.columns:
-                try:
-                    _df['Cantidad (Cabezas)'] = _df['Cantidad (Cabezas)'].round(0).astype('int64')
-                except Exception:
-                    pass
-            for _c in ('Kilos','Monto Bruto (sin gastos)','Precio ($ UM)'):
-                if _c in _df.columns:
-                    try:
-                        _df[_c] = pd.to_numeric(_df[_c], errors='coerce').round(2)
-                    except Exception:
-                        pass
-        # Cantidades siempre enteras
-        if 'Cantidad (Cabezas)' in resumen.columns:
-            try:
-                resumen['Cantidad (Cabezas)'] = resumen['Cantidad (Cabezas)'].round(0).astype('int64')
-            except Exception:
-                pass
-        return df_detail, resumen
-
-    df_ctrl_v_detail = pd.DataFrame(ctrl_v_detail)
-    df_ctrl_c_detail = pd.DataFrame(ctrl_c_detail)
-
-    dv_det, dv_res = _ctrl(df_ctrl_v_detail)
-    dc_det, dc_res = _ctrl(df_ctrl_c_detail)
-
-    df_libro_ventas = pd.DataFrame(libro_ventas_rows)
-
-    df_ventas_salida = pd.DataFrame(ventas_salida_rows)
-    # Mantener columna interna __bold__ para formateo en export
-    if "__bold__" not in df_ventas_salida.columns:
-        df_ventas_salida["__bold__"] = False
-    df_ventas_salida = df_ventas_salida.reindex(columns=[*EMITIDOS_SALIDA_COLS, "__bold__"], fill_value="")
-    df_compras_gastos_salida = pd.DataFrame(compras_gastos_salida_rows, columns=RECIBIDOS_SALIDA_COLS)
+    if not docs:
+        return {k: v.copy() for k, v in _EMPTY_OUTPUTS.items()}
+
+    n = len(docs)
+    doc_roles = np.array([roles.get(d.filename, "RECEPTOR") for d in docs], dtype=object)
+
+    soa = _docs_to_soa(docs, doc_roles == "EMISOR")
+    mov_arr = movimiento_por_regla_vec(soa["cod_arca"], doc_roles)
+    s_m, s_h = soa["s_m"], soa["s_h"]
+    importe_bruto, iva_bruto = soa["bruto"], soa["iva"]
+    total_gastos, iva_gastos = soa["gastos"], soa["iva_gastos"]
+
+    # Neto sin gastos (según tu regla): base hacienda = Importe Bruto (sin IVA, sin gastos)
+    neto_hacienda = np.multiply(importe_bruto, s_m)
+    iva_hacienda = np.multiply(iva_bruto, s_m)
+    gastos_s = np.multiply(total_gastos, s_m)
+    iva_gastos_s = np.multiply(iva_gastos, s_m)
+
+    # Alícuota implícita en los totales (IVA s/Bruto / Importe Bruto) y en los gastos
+    alic_totales = _pct_from_totales_vec(importe_bruto, iva_bruto)
+    alic_gastos = _pct_from_totales_vec(total_gastos, iva_gastos)
+
+    # Items de todos los comprobantes en columnas planas (SoA); item_doc = posición del doc en docs
+    items = [it for d in docs for it in d.items]
+    it_arr = items_as_arrays(items)
+    for col in ("cabezas", "kilos", "precio", "bruto", "iva_importe"):
+        np.nan_to_num(it_arr[col], copy=False, nan=0.0)
+    items_por_doc = np.fromiter((len(d.items) for d in docs), dtype=np.int64, count=n)
+    item_doc = np.repeat(np.arange(n, dtype=np.int32), items_por_doc)
+
+    # Resumen cabezas/kilos y Libro IVA Ventas (neto/IVA por alícuota 21 / 10.5 / exento)
+    # por comprobante. Sin % en el item (NaN) => fallback por totales.
+    item_cols = (it_arr["cabezas"], it_arr["kilos"], it_arr["bruto"], it_arr["iva_importe"], it_arr["iva_pct"])
+    reduce_items = _reduce_items_jit if _reduce_items_jit is not None else _reduce_items_numpy
+    por_doc = reduce_items(item_doc, n, *item_cols, s_m, s_h, alic_totales)
+    cabezas, kilos, neto_105, iva_105, neto_21, iva_21, exento = por_doc
+
+    # Categoría/Raza: categorías distintas del comprobante, ordenadas y unidas por coma
+    cats = pd.DataFrame({"doc_idx": item_doc, "categoria": [(c or "").strip() for c in it_arr["categoria"]]})
+    categorias = (
+        cats.loc[cats["categoria"] != ""]
+        .drop_duplicates()
+        .sort_values("categoria", kind="stable")
+        .groupby("doc_idx", sort=False)["categoria"].agg(", ".join)
+        .reindex(range(n), fill_value="")
+    )
+
+    # Control hacienda por item, ya con signo: cabezas/kilos según s_h, monto según s_m
+    it_cantidad = np.round(it_arr["cabezas"] * s_h[item_doc])
+    it_kilos = it_arr["kilos"] * s_h[item_doc]
+    it_monto = it_arr["bruto"] * s_m[item_doc]
+
+    df_docs = pd.DataFrame({
+        "Fecha": soa["fecha"],
+        "Fecha Operación": soa["fecha_operacion"],
+        "Título": soa["titulo"],
+        "Tipo": soa["tipo_interno"],
+        "Cód ARCA": soa["cod_arca"],
+        "Letra": soa["letra"],
+        "PV": soa["pv"],
+        "Número": soa["numero"],
+        "Ajuste": np.where(soa["es_ajuste"], "SI", "NO").astype(object),
+        "Ajuste sentido": soa["ajuste_sentido"],
+        "Ajuste tipo": soa["ajuste_tipo"],
+        "Contraparte CUIT": soa["cp_cuit"],
+        "Contraparte": soa["cp_nombre"],
+        "Cond IVA": soa["cp_condiva"],
+        "Categoría/Raza": categorias.to_numpy(dtype=object),
+        "Cabezas": cabezas,
+        "Kilos": kilos,
+        "Neto Hacienda (sin gastos)": neto_hacienda,
+        "IVA Hacienda": iva_hacienda,
+        "Gastos (sin IVA)": gastos_s,
+        "IVA Gastos": iva_gastos_s,
+    }, columns=RESUMEN_COLS)
+
+    df_ventas = df_docs.loc[mov_arr == "VENTA"].reset_index(drop=True)
+    df_compras = df_docs.loc[mov_arr == "COMPRA"].reset_index(drop=True)
+
+    # --- Ventas (formato "Emitidos Salida") ---
+    # Alicuota: primer % informado en los items; si no hay (o es 0), la de los totales
+    alic_items = (
+        pd.Series(it_arr["iva_pct"]).groupby(item_doc, sort=False).first()
+        .reindex(range(n)).fillna(0.0).to_numpy(dtype=float)
+    )
+    alic_venta = np.where(alic_items != 0.0, alic_items, alic_totales)
+    alicuota_col = alic_venta.astype(object)
+    alicuota_col[alic_venta == 0.0] = ""
+    # Sólo comprobantes de VENTA; el índice del frame es la posición del doc en docs
+    idx_v = np.flatnonzero(mov_arr == "VENTA")
+    neto_v = neto_hacienda[idx_v]
+    iva_v = iva_hacienda[idx_v]
+    # sin IVA => va como Ex/Ng
+    sin_iva = iva_bruto[idx_v] == 0.0
+    neto_col = np.where(sin_iva, 0.0, neto_v)
+    exng_col = np.where(sin_iva, neto_v, 0.0)
+    docs_v = df_docs.iloc[idx_v]
+    fecha_op = soa["fecha_operacion"][idx_v]
+    df_emitidos = pd.DataFrame({
+        "Fecha Emisión": docs_v["Fecha"],
+        "Fecha Recepción": docs_v["Fecha"].where(~fecha_op.astype(bool), fecha_op),
+        "Concepto": 141,
+        "Tipo": docs_v["Tipo"],
+        "Letra": docs_v["Letra"],
+        "Punto de Venta": docs_v["PV"],
+        "Número Desde": docs_v["Número"],
+        "Número Hasta": docs_v["Número"],
+        "Nro. Doc. Emisor": docs_v["Contraparte CUIT"],
+        "Denominación Emisor": docs_v["Contraparte"],
+        "Condición Fiscal": docs_v["Cond IVA"],
+        "TD": 80,
+        "Tipo Cambio": 1,
+        "Moneda": "PES",
+        "Alicuota": alicuota_col[idx_v],
+        "Cód": 141,
+        "Neto": neto_col,
+        "IVA": iva_v,
+        "Ex/Ng": exng_col,
+        "Otros Conceptos": 0.0,
+        "Total": neto_col + iva_v + exng_col,
+        "__bold__": False,
+    }, index=idx_v)
+
+    # Retenciones / Impuestos (fila adicional en Otros Conceptos, en positivo, en negrita)
+    reten = pd.DataFrame(
+        [(i, amt) for i, d in enumerate(docs) for _lbl, amt in d.retenciones],
+        columns=["doc_idx", "importe"],
+    )
+    reten["importe"] = pd.to_numeric(reten["importe"], errors="coerce").fillna(0.0).astype(float)
+    reten = reten.loc[(reten["importe"] != 0.0) & (mov_arr[reten["doc_idx"].to_numpy(dtype=np.intp)] == "VENTA")]
+    df_reten = df_emitidos.loc[reten["doc_idx"]].assign(**{
+        "Alicuota": "",
+        "Neto": 0.0,
+        "IVA": 0.0,
+        "Ex/Ng": 0.0,
+        "Otros Conceptos": reten["importe"].to_numpy(),
+        "Total": reten["importe"].to_numpy(),
+        "__bold__": True,
+    })
+
+    # Gastos detalle: una fila por gasto, con los datos del comprobante por posición
+    g_arr = gastos_as_arrays([g for d in docs for g in d.gastos])
+    gasto_doc = np.repeat(np.arange(n, dtype=np.int32), [len(d.gastos) for d in docs])
+    gasto_iva = g_arr["iva_importe"] * s_m[gasto_doc]
+    iva_col = gasto_iva.astype(object)
+    iva_col[np.isnan(gasto_iva)] = ""
+    # Sin % o 0% => "" (el `iva_pct or ""` de cada gasto)
+    pct_col = g_arr["iva_pct"].astype(object)
+    pct_col[np.isnan(g_arr["iva_pct"]) | (g_arr["iva_pct"] == 0)] = ""
+    df_gastos = (
+        df_docs[["Fecha", "Tipo", "Cód ARCA", "PV", "Número", "Contraparte"]]
+        .iloc[gasto_doc]
+        .reset_index(drop=True)
+        .assign(**{
+            "Movimiento": mov_arr[gasto_doc],
+            "Concepto": g_arr["concepto"],
+            "Importe (sin IVA)": g_arr["importe"] * s_m[gasto_doc],
+            "IVA %": pct_col.tolist(),
+            "IVA $": iva_col,
+        })
+        .reindex(columns=GASTOS_COLS)
+    )
+
+    # Control hacienda: un solo frame con todos los items (ya con signo); el monto neto sin
+    # gastos es el bruto de cada item. Detalle y resumen por movimiento de su comprobante.
+    df_ctrl_items = pd.DataFrame(_ctrl_detail_arrays({
+        "Tipo de Hacienda": it_arr["categoria"],
+        "UM": it_arr["um"],
+        "Precio ($ UM)": it_arr["precio"],
+        "Cantidad (Cabezas)": it_cantidad,
+        "Kilos": it_kilos,
+        "Monto Bruto (sin gastos)": it_monto,
+    }), columns=CTRL_DETALLE_COLS)
+    ctrl = _ctrl_por_movimiento(df_ctrl_items, mov_arr[item_doc])
+    dv_det, dv_res = ctrl["VENTA"]
+    dc_det, dc_res = ctrl["COMPRA"]
+
+    # Libro IVA Ventas (solo VENTAS, sólo hacienda)
+    es_venta = mov_arr == "VENTA"
+    libro_total = neto_105 + iva_105 + neto_21 + iva_21 + exento
+    # Redondeo a centavos de las 6 columnas de montos en una sola pasada
+    libro_montos = np.round(np.vstack([neto_105, iva_105, neto_21, iva_21, exento, libro_total]), 2)
+    df_libro_ventas = pd.DataFrame({
+        "Fecha": df_docs["Fecha"],
+        "Tipo": df_docs["Tipo"],
+        "Cód ARCA": df_docs["Cód ARCA"],
+        "Letra": df_docs["Letra"],
+        "PV": df_docs["PV"],
+        "Número": df_docs["Número"],
+        "CUIT Cliente": df_docs["Contraparte CUIT"],
+        "Razón Social Cliente": df_docs["Contraparte"],
+        "Cond IVA": df_docs["Cond IVA"],
+        "Neto 10.5": libro_montos[0],
+        "IVA 10.5": libro_montos[1],
+        "Neto 21": libro_montos[2],
+        "IVA 21": libro_montos[3],
+        "Exento": libro_montos[4],
+        "Total": libro_montos[5],
+    }, columns=LIBRO_VENTAS_COLS).loc[es_venta].reset_index(drop=True)
+
+    # Cada comprobante seguido de sus filas de retenciones (el índice es la posición en docs).
+    # Ambas partes ya traen todas las columnas (y __bold__) en el orden de salida.
+    df_ventas_salida = pd.concat([df_emitidos, df_reten]).sort_index(kind="stable", ignore_index=True)
+    df_compras_gastos_salida = _recibidos_salida(
+        soa, mov_arr, neto_hacienda, iva_hacienda, alic_totales, gastos_s, iva_gastos_s, alic_gastos
+    )
+
+    for _df in (df_ventas, df_compras, df_gastos, df_libro_ventas, df_ventas_salida, df_compras_gastos_salida):
+        _compact_dtypes(_df)
 
     return {
         "ventas": df_ventas,
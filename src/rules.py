@@ -1,51 +1,66 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Optional, Literal
 import re
 
+import numpy as np
+
 Role = Literal["EMISOR", "RECEPTOR"]
 Movimiento = Literal["VENTA", "COMPRA", "NEUTRO"]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Ajuste:
     """Describe si el comprobante es un ajuste y cómo impacta."""
 
     es_ajuste: bool
     sentido: Optional[Literal["CREDITO", "DEBITO"]] = None
     tipo: Optional[Literal["FISICO", "MONETARIO"]] = None
+    # Derivados, calculados una vez al crear el ajuste:
+    # signo para importes (crédito = -1, débito = +1, no ajuste = +1)
+    signo_montos: int = field(init=False, repr=False, compare=False)
+    # sólo el ajuste físico afecta cabezas y kilos
+    afecta_cabezas_kilos: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "signo_montos", -1 if self.es_ajuste and self.sentido == "CREDITO" else 1)
+        object.__setattr__(self, "afecta_cabezas_kilos", self.es_ajuste and self.tipo == "FISICO")
 
-    @property
-    def signo_montos(self) -> int:
-        """Signo para importes: crédito = -1, débito = +1, no ajuste = +1."""
-        if not self.es_ajuste:
-            return 1
-        return -1 if self.sentido == "CREDITO" else 1
 
-    @property
-    def afecta_cabezas_kilos(self) -> bool:
-        """Sólo el ajuste físico afecta cabezas y kilos."""
-        return self.es_ajuste and self.tipo == "FISICO"
+# Una sola pasada sobre el texto: AJUSTE (con su tipo si viene pegado) / CRÉDITO / DÉBITO
+_RE_AJUSTE = re.compile(r"AJUSTE(?: (F[ÍI]SICO)| (FINANCIERO|MONETARIO))?|(CR[ÉE]DITO)|(D[ÉE]BITO)")
 
 
 def detectar_ajuste(texto: str) -> Ajuste:
     t = texto.upper()
-    if "AJUSTE" not in t:
+    es_ajuste = credito = debito = fisico = monetario = False
+    for m in _RE_AJUSTE.finditer(t):
+        m_fisico, m_monetario, m_credito, m_debito = m.groups()
+        if m_credito:
+            credito = True
+        elif m_debito:
+            debito = True
+        else:
+            es_ajuste = True
+            fisico = fisico or m_fisico is not None
+            monetario = monetario or m_monetario is not None
+    if not es_ajuste:
         return Ajuste(False)
 
-    # Sentido
+    # Sentido (crédito tiene prioridad)
     sentido: Optional[Literal["CREDITO", "DEBITO"]] = None
-    if "CRÉDITO" in t or "CREDITO" in t:
+    if credito:
         sentido = "CREDITO"
-    elif "DÉBITO" in t or "DEBITO" in t:
+    elif debito:
         sentido = "DEBITO"
 
     # Tipo
     tipo: Optional[Literal["FISICO", "MONETARIO"]] = None
-    if "AJUSTE FÍSICO" in t or "AJUSTE FISICO" in t:
+    if fisico:
         tipo = "FISICO"
-    elif "AJUSTE FINANCIERO" in t or "AJUSTE MONETARIO" in t:
+    elif monetario:
         tipo = "MONETARIO"
 
     return Ajuste(True, sentido=sentido, tipo=tipo)
@@ -72,41 +87,67 @@ def movimiento_por_regla(cod_arca: int, role: Role) -> Movimiento:
     return "NEUTRO"
 
 
-def tipo_interno_por_cod(cod_arca: int, texto: str) -> str:
-    t = texto.upper()
+def movimiento_por_regla_vec(cod_arca: np.ndarray, roles: np.ndarray) -> np.ndarray:
+    """`movimiento_por_regla` sobre arrays de códigos ARCA y roles.
+
+    La regla se evalúa una vez por código distinto (para ambos roles) y se reparte con índices.
+    """
+    cod_u, inv = np.unique(np.asarray(cod_arca, dtype=np.int64), return_inverse=True)
+    tabla = np.array(
+        [[movimiento_por_regla(int(c), "EMISOR"), movimiento_por_regla(int(c), "RECEPTOR")] for c in cod_u],
+        dtype=object,
+    ).reshape(len(cod_u), 2)
+    col = np.where(np.asarray(roles) == "EMISOR", 0, 1)
+    return tabla[inv.ravel(), col]
+
+
+@lru_cache(maxsize=64)
+def tipo_interno_por_ajuste(cod_arca: int, es_ajuste_credito: bool) -> str:
+    """Tipo interno según código ARCA y si es un ajuste de crédito (ver `detectar_ajuste`)."""
     # Ajustes: CN / LA / LN según vos
     if cod_arca in (186, 188):
-        if "AJUSTE" in t and ("CRÉDITO" in t or "CREDITO" in t):
+        if es_ajuste_credito:
             return "CN"  # Nota de crédito
         return "CD"
 
     if cod_arca == 180:
-        if "AJUSTE" in t and ("CRÉDITO" in t or "CREDITO" in t):
+        if es_ajuste_credito:
             return "LA"
         return "CV"
 
     if cod_arca in (183, 185):
-        if "AJUSTE" in t and ("CRÉDITO" in t or "CREDITO" in t):
+        if es_ajuste_credito:
             return "LN"
         return "LC"
 
     if cod_arca in (190, 191):
-        if "AJUSTE" in t and ("CRÉDITO" in t or "CREDITO" in t):
+        if es_ajuste_credito:
             return "CN"
         return "VC"
 
     return "OTRO"
 
 
+def tipo_interno_por_cod(cod_arca: int, texto: str) -> str:
+    t = texto.upper()
+    return tipo_interno_por_ajuste(cod_arca, "AJUSTE" in t and ("CRÉDITO" in t or "CREDITO" in t))
+
+
+_RE_COND_IVA = re.compile(r"(MONOTRIB)|(EXENT)|(RESPONSABLE)|(INSCRIP)|(IVA)|(RESP)")
+
+
+@lru_cache(maxsize=256)
 def condicion_iva_abreviar(texto: str) -> str:
     t = (texto or "").upper()
-    if "MONOTRIB" in t:
+    # Qué palabras clave aparecen, en una sola pasada (RESPONSABLE cuenta también como RESP)
+    vistos = {m.lastindex for m in _RE_COND_IVA.finditer(t)}
+    if 1 in vistos:
         return "MT"
-    if "EXENT" in t:
+    if 2 in vistos:
         return "EX"
-    if "RESPONSABLE" in t and "INSCRIP" in t:
+    if 3 in vistos and 4 in vistos:
         return "RI"
     # fallbacks
-    if "IVA" in t and "RESP" in t:
+    if 5 in vistos and (3 in vistos or 6 in vistos):
         return "RI"
     return ""
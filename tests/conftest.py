@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Los tests importan `src.*` desde la raíz del repo (igual que app.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+ENCABEZADO = [
+    "ORIGINAL A LIQUIDACION DE COMPRA DIRECTA N° 00003-00012345",
+    "CONSIGNATARIA GANADERA SOCIEDAD Cód. 186",
+    "ANONIMA",
+    "Fecha 12/03/2024",
+    "CUIT: 30712345678 Ingresos Brutos: 901-123456-7",
+    "Condicion frente al IVA: IVA Responsable Inscripto",
+    "Receptor",
+    "Razón Social: ESTABLECIMIENTO LA PAMPA SA",
+    "CUIT: 20123456789 Situación IVA: Responsable Monotributo",
+    "Fecha Operación:10/03/2024",
+]
+
+TABLA_ITEMS = [
+    ["Categoría/Raza", "Cabezas", "UM", "Cantidad", "$ UM", "$ Bruto", "% IVA", "$ IVA"],
+    ["Novillo Angus", "25", "Kg Vivo", "11,250", "1,800.00", "20,250,000.00", "10.50", "2,126,250.00"],
+    ["Vaca Brangus", "10", "Cabeza", "10", "350,000.00", "3,500,000.00", "10.50", "367,500.00"],
+]
+
+CIERRE = [
+    "Gastos Base Alicuota Importe IVA",
+    "Comision 23,750,000.00 3.00 712,500.00 21.00 149,625.00",
+    "Importe Bruto: $ {bruto}",
+    "IVA s/Bruto: $ 2,493,750.00",
+    "Total Gastos: $ 712,500.00",
+    "IVA s/Gastos: $ 149,625.00",
+    "Ret. Ganancias: $ 12,345.67",
+    "Importe Neto: $ 25,418,280.33",
+]
+
+
+@pytest.fixture
+def liquidacion_pdf(tmp_path):
+    """Fábrica de PDFs sintéticos con el formato de una liquidación (encabezado, tabla de items, totales)."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    def make(nombre="liquidacion.pdf", tabla=TABLA_ITEMS, bruto="23,750,000.00", anexos=()):
+        st = getSampleStyleSheet()
+        story = [Paragraph(x, st["Normal"]) for x in ENCABEZADO]
+        story.append(Spacer(1, 8))
+        t = Table(tabla)
+        t.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black)]))
+        story += [t, Spacer(1, 8)]
+        story += [Paragraph(x.format(bruto=bruto), st["Normal"]) for x in CIERRE]
+        for texto in anexos:
+            story += [PageBreak(), Paragraph(texto, st["Normal"])]
+        path = tmp_path / nombre
+        SimpleDocTemplate(str(path), pagesize=A4).build(story)
+        return str(path)
+
+    return make
+
+
+@pytest.fixture
+def paginas_pdf(tmp_path):
+    """Fábrica de PDFs con una línea de texto por página."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    def make(*paginas, nombre="paginas.pdf"):
+        path = tmp_path / nombre
+        c = canvas.Canvas(str(path), pagesize=A4)
+        for texto in paginas:
+            c.drawString(72, 720, texto)
+            c.showPage()
+        c.save()
+        return str(path)
+
+    return make
@@ -0,0 +1,285 @@
+import pytest
+
+from src import parser
+from src.parser import ItemHacienda, parse_pdf
+
+
+TABLA_KG_VIVO = [
+    ["Categoría/Raza", "Cabezas", "UM", "Cantidad", "$ UM", "$ Bruto", "% IVA", "$ IVA"],
+    ["Novillo Angus", "25", "Kg Vivo", "11,250", "1,800.00", "20,250,000.00", "10.50", "2,126,250.00"],
+    ["Vaquillona", "10", "Kg Vivo", "3,500", "1,000.00", "3,500,000.00", "10.50", "367,500.00"],
+]
+
+
+def _item(categoria, um="Kg Vivo", cabezas=10, kilos=4000, precio=1000.0, bruto=4_000_000.0):
+    return ItemHacienda(categoria, cabezas, kilos, um, precio, bruto, 10.5, bruto * 0.105)
+
+
+# --- Items: vía por texto vs tabla del PDF ---
+
+def test_items_cuadran_solo_kg_vivo_consistentes():
+    assert parser._items_cuadran([_item("Novillo")], 4_000_000.0)
+    # La suma no cierra contra Importe Bruto
+    assert not parser._items_cuadran([_item("Novillo")], 5_000_000.0)
+    # precio x kilos no da el bruto
+    assert not parser._items_cuadran([_item("Novillo", precio=900.0)], 4_000_000.0)
+    # Filas Cabeza/Unidad: los kilos sólo vienen bien de la tabla
+    assert not parser._items_cuadran([_item("Vaca", um="Cabeza", kilos=0, precio=400_000.0)], 4_000_000.0)
+    assert not parser._items_cuadran([], 4_000_000.0)
+
+
+def test_categorias_texto_limpias():
+    assert parser._categorias_texto_limpias("Categoría/Raza Cabezas UM\nNovillo 10 Kg Vivo")
+    assert not parser._categorias_texto_limpias("Cliente Categoría/Raza Cabezas UM\nJUAN PEREZ Novillo 10 Kg Vivo")
+    assert not parser._categorias_texto_limpias("Categoría/Raza Cabezas UM Cliente\nNovillo 10 Kg Vivo JUAN PEREZ")
+    assert not parser._categorias_texto_limpias("sin tabla de items")
+
+
+def test_parse_pdf_usa_texto_si_cuadra(liquidacion_pdf, monkeypatch):
+    path = liquidacion_pdf(tabla=TABLA_KG_VIVO)
+
+    def _sin_tabla(_path):
+        raise AssertionError("no debería extraer la tabla")
+
+    monkeypatch.setattr(parser, "parse_items_from_pdf", _sin_tabla)
+    doc = parse_pdf(path)
+    assert [(it.categoria, it.cabezas, it.kilos) for it in doc.items] == [
+        ("Novillo Angus", 25.0, 11250.0),
+        ("Vaquillona", 10.0, 3500.0),
+    ]
+
+
+def test_parse_pdf_cabeza_va_por_tabla(liquidacion_pdf):
+    doc = parse_pdf(liquidacion_pdf())
+    # La tabla toma los kilos de la columna Cantidad también en filas "Cabeza"
+    assert [(it.categoria, it.um, it.kilos) for it in doc.items] == [
+        ("Novillo Angus", "Kg Vivo", 11250.0),
+        ("Vaca Brangus", "Cabeza", 10.0),
+    ]
+
+
+def test_parse_pdf_columna_cliente_va_por_tabla(liquidacion_pdf):
+    tabla = [
+        ["Cliente", "Categoría/Raza", "Cabezas", "UM", "Cantidad", "$ UM", "$ Bruto", "% IVA", "$ IVA"],
+        ["JUAN PEREZ", "Novillo", "25", "Kg Vivo", "11,250", "1,800.00", "20,250,000.00", "10.50", "2,126,250.00"],
+        ["20111222333 - ANA GOMEZ", "Vaquillona", "10", "Kg Vivo", "3,500", "1,000.00", "3,500,000.00", "10.50", "367,500.00"],
+    ]
+    path = liquidacion_pdf(tabla=tabla)
+    # Los importes cierran, pero por texto el cliente queda pegado a la categoría
+    assert [it.categoria for it in parser.parse_items(parser.extract_full_text(path))][0] == "JUAN PEREZ Novillo"
+    assert [it.categoria for it in parse_pdf(path).items] == ["Novillo", "Vaquillona"]
+
+
+# --- Rótulos de bloque (_find_span) ---
+
+@pytest.mark.parametrize("text, prefijo, pattern", [
+    ("Sin gastos. x GASTOS Gastos", "gastos", parser._RE_GASTOS),
+    ("xgastos gastosx gastos_ Gastos", "gastos", parser._RE_GASTOS),
+    ("Receptores\nRECEPTOR\nReceptor", "receptor", parser._RE_RECEPTOR),
+    ("Categoria / Raza\nCategoría/Raza", "categor", parser._RE_CATEGORIA_HDR),
+    ("categoría\n/\nRAZA", "categor", parser._RE_CATEGORIA_HDR),
+    ("fecha operacion: Fecha Operación:", "fecha operaci", parser._RE_FECHA_OPERACION),
+    ("İ importe bruto: Importe Bruto:", "importe bruto:", parser._RE_IMPORTE_BRUTO),
+    ("nada", "gastos", parser._RE_GASTOS),
+])
+def test_find_span_igual_al_regex(text, prefijo, pattern):
+    low = parser._lower(text)
+    for start in range(len(text) + 1):
+        for end in (None, len(text) // 2, len(text)):
+            m = pattern.search(text, start, len(text) if end is None else end)
+            assert parser._find_span(text, low, prefijo, pattern, start, end) == (m.span() if m else None)
+
+
+def test_lower_solo_si_conserva_posiciones():
+    assert parser._lower("Gastos ÁÉ") == "gastos áé"
+    assert parser._lower("İ") is None  # pasa a 2 caracteres
+
+
+def test_rotulos_en_minusculas():
+    text = parser.normalize_text(
+        "liquidacion de hacienda\nreceptor\nrazón social: LA PAMPA SA\nCUIT: 20123456789\nfecha operación:10/03/2024\n"
+        "categoría / raza cabezas um cantidad\nNovillo 25 Kg Vivo 11,250 1,800.00 20,250,000.00\n"
+        "gastos base alicuota importe iva\nComision 712,500.00 21.00 149,625.00\nimporte bruto: $ 20,250,000.00"
+    )
+    _, receptor = parser.parse_parties(text)
+    assert (receptor.cuit, receptor.nombre) == ("20123456789", "LA PAMPA SA")
+    assert [(it.categoria, it.kilos) for it in parser.parse_items(text)] == [("Novillo", 11250.0)]
+    assert [(g.concepto, g.importe) for g in parser.parse_gastos(text)] == [("Comision", 712_500.0)]
+
+
+# --- Cache en disco de parse_pdf ---
+
+def test_parse_pdf_cached_sin_cache_no_escribe(liquidacion_pdf, tmp_path, monkeypatch):
+    path = liquidacion_pdf()
+    monkeypatch.chdir(tmp_path)
+    parser.parse_pdf_cached(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["liquidacion.pdf"]
+
+
+def test_parse_pdf_cached_hit_miss_y_version(liquidacion_pdf, tmp_path, monkeypatch):
+    path = liquidacion_pdf()
+    cache = tmp_path / "cache"
+    doc = parser.parse_pdf_cached(path, cache_dir=str(cache))
+    (entrada,) = cache.iterdir()
+    assert entrada.suffix == ".json"
+    assert f"-{parser._PARSER_VERSION}-" in entrada.name
+
+    # Hit: mismo resultado sin volver a parsear
+    monkeypatch.setattr(parser, "parse_pdf", lambda _p: pytest.fail("debería salir del cache"))
+    assert parser.parse_pdf_cached(path, cache_dir=str(cache)) == doc
+
+    # Otra versión del parser => otra clave => se parsea de nuevo
+    monkeypatch.setattr(parser, "_PARSER_VERSION", parser._PARSER_VERSION + 1)
+    monkeypatch.setattr(parser, "parse_pdf", lambda _p: doc)
+    parser.parse_pdf_cached(path, cache_dir=str(cache))
+    assert len(list(cache.iterdir())) == 2
+
+
+def test_parse_pdf_cached_entrada_corrupta_se_reparsea(liquidacion_pdf, tmp_path):
+    path = liquidacion_pdf()
+    cache = tmp_path / "cache"
+    doc = parser.parse_pdf_cached(path, cache_dir=str(cache))
+    (entrada,) = cache.iterdir()
+    entrada.write_text("{no es json", encoding="utf-8")
+    assert parser.parse_pdf_cached(path, cache_dir=str(cache)) == doc
+
+
+def test_podar_cache(tmp_path, monkeypatch):
+    import os
+    import time
+
+    monkeypatch.setattr(parser, "_CACHE_MAX_ENTRADAS", 2)
+    ahora = time.time()
+    for k, edad in enumerate([0, 10, 20, parser._CACHE_TTL_SEGUNDOS + 1]):
+        f = tmp_path / f"e{k}.json"
+        f.write_text("{}")
+        os.utime(f, (ahora - edad, ahora - edad))
+    parser._podar_cache(tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["e0.json", "e1.json"]
+
+
+# --- Retenciones ---
+
+def test_parse_retenciones_suma_por_concepto():
+    text = (
+        "Ret. Ganancias: $ 12,345.67\nRet Ganancias - 100.00\n"
+        "Ret. Imp. Nacionales: 50.00\nImp. Nacional Ret.: 25.50"
+    )
+    assert parser.parse_retenciones(text) == [("Ret. Ganancias", 12_445.67), ("Ret. Imp. Nacionales", 75.5)]
+
+
+def test_parse_retenciones_ignora_ceros_y_respeta_orden():
+    assert parser.parse_retenciones("IMP NACIONALES RET 10.00\nret. ganancias: $ 0.00") == [("Ret. Imp. Nacionales", 10.0)]
+    assert parser.parse_retenciones("IMP NACIONALES RET 10.00\nRet. Ganancias 1.00") == [
+        ("Ret. Ganancias", 1.0),
+        ("Ret. Imp. Nacionales", 10.0),
+    ]
+    assert parser.parse_retenciones("sin retenciones") == []
+
+
+# --- Categoría por texto ---
+
+@pytest.mark.parametrize("line, categoria", [
+    ("30712345678 - CLIENTE SA Novillo Angus 25 Kg Vivo 11,250 1,800.00 20,250,000.00 10.50 2,126,250.00",
+     "CLIENTE SA Novillo Angus"),
+    ("Vaca Brangus 10 Cabeza 10 350,000.00 3,500,000.00", "Vaca Brangus"),
+    ("Toro 1 UN 1 900,000.00", "Toro"),
+    ("Ternero Kg. 1,234 Vivo 2,000.00", "Ternero"),
+    ("Vaquillona. Hereford 3 Unidades 3", "Vaquillona Hereford"),
+    ("Novillito/ Cruza -", "Novillito/ Cruza"),
+    ("Kgs Vivo Terneros", "Kgs Vivo Terneros"),
+])
+def test_text_only_category(line, categoria):
+    assert parser._text_only_category(line) == categoria
+
+
+# --- Totales ---
+
+def test_parse_totales():
+    text = (
+        "Importe Bruto: $ 23,750,000.00\nIVA s/Bruto: $ 2,493,750.00\nTotal Gastos: 712,500.00\n"
+        "iva s/gastos:$149,625.00\nImporte Neto: $ 25,418,280.33"
+    )
+    assert parser.parse_totales(text) == {
+        "importe_bruto": 23_750_000.0,
+        "iva_bruto": 2_493_750.0,
+        "total_gastos": 712_500.0,
+        "iva_gastos": 149_625.0,
+        "importe_neto": 25_418_280.33,
+    }
+
+
+def test_parse_totales_faltantes_en_cero():
+    # Sin centavos no es un total válido
+    assert parser.parse_totales("Importe Bruto: $ 100\nImporte Neto: 5.00") == {
+        "importe_bruto": 0.0,
+        "iva_bruto": 0.0,
+        "total_gastos": 0.0,
+        "iva_gastos": 0.0,
+        "importe_neto": 5.0,
+    }
+
+
+# --- Extracción de texto por páginas ---
+
+BACKENDS = ["pdfplumber", pytest.param("pdfium", marks=pytest.mark.skipif(parser.pdfium is None, reason="sin pypdfium2"))]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_extract_full_text_corta_al_completar_el_bloque(paginas_pdf, backend):
+    path = paginas_pdf("Receptor CUIT: 20123456789", "Importe Neto: $ 1,000.00", "Pagina anexa")
+    text = parser.extract_full_text(path, backend=backend)
+    assert "Importe Neto:" in text
+    assert "Pagina anexa" not in text
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_extract_full_text_max_pages(paginas_pdf, backend):
+    path = paginas_pdf("pagina uno", "pagina dos", "pagina tres")
+    # Sin los rótulos de cierre se leen todas las páginas, salvo que se limite
+    assert "pagina tres" in parser.extract_full_text(path, backend=backend)
+    text = parser.extract_full_text(path, max_pages=2, backend=backend)
+    assert "pagina dos" in text
+    assert "pagina tres" not in text
+
+
+def test_parse_pdf_ignora_paginas_anexas(liquidacion_pdf):
+    doc = parse_pdf(liquidacion_pdf(anexos=["Pagina anexa Datos Adicionales"]))
+    assert (doc.importe_bruto, doc.importe_neto) == (23_750_000.0, 25_418_280.33)
+    assert [it.categoria for it in doc.items] == ["Novillo Angus", "Vaca Brangus"]
+
+
+# --- Lotes de PDFs ---
+
+def _importes(resultados):
+    return [r if isinstance(r, Exception) else r.importe_bruto for r in resultados]
+
+
+def test_parse_pdfs_cached_serie_orden_y_error_en_su_lugar(liquidacion_pdf, tmp_path):
+    a = liquidacion_pdf("a.pdf")
+    b = liquidacion_pdf("b.pdf", bruto="1,000.00")
+    res = parser.parse_pdfs_cached([a, str(tmp_path / "no_existe.pdf"), b])
+    assert isinstance(res[1], Exception)
+    assert [res[0].importe_bruto, res[2].importe_bruto] == [23_750_000.0, 1_000.0]
+
+
+def test_parse_pdfs_cached_en_paralelo_conserva_orden(liquidacion_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, "_PARALLEL_MIN_PDFS", 2)
+    monkeypatch.setattr(parser.os, "cpu_count", lambda: 2)
+    paths = [liquidacion_pdf(f"{i}.pdf", bruto=f"{i},000.00") for i in range(1, 4)]
+    paths.insert(1, str(tmp_path / "no_existe.pdf"))
+    res = parser.parse_pdfs_cached(paths)
+    assert isinstance(res[1], Exception)
+    assert _importes(res[:1] + res[2:]) == [1_000.0, 2_000.0, 3_000.0]
+
+
+def test_parse_pdfs_cached_pool_caido_sigue_en_serie(liquidacion_pdf, monkeypatch):
+    class PoolRoto:
+        def __init__(self, *args, **kwargs):
+            raise parser.BrokenProcessPool("sin procesos")
+
+    monkeypatch.setattr(parser, "_PARALLEL_MIN_PDFS", 2)
+    monkeypatch.setattr(parser.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(parser, "ProcessPoolExecutor", PoolRoto)
+    paths = [liquidacion_pdf(f"{i}.pdf", bruto=f"{i},000.00") for i in range(1, 3)]
+    assert _importes(parser.parse_pdfs_cached(paths)) == [1_000.0, 2_000.0]
@@ -0,0 +1,226 @@
+import numpy as np
+import pytest
+
+from src.parser import Gasto, ItemHacienda, ParsedDoc, Party
+from src.processor import (
+    CTRL_DETALLE_COLS,
+    EMITIDOS_SALIDA_COLS,
+    GASTOS_COLS,
+    LIBRO_VENTAS_COLS,
+    RECIBIDOS_SALIDA_COLS,
+    RESUMEN_COLS,
+    _reduce_items_loop,
+    _reduce_items_numpy,
+    build_outputs,
+)
+from src.rules import Ajuste
+
+CONSIGNATARIA = Party(cuit="30712345678", nombre="CONSIGNATARIA SA", cond_iva="RI")
+PRODUCTOR = Party(cuit="20123456789", nombre="LA PAMPA SA", cond_iva="MT")
+
+
+def _doc(filename, cod_arca, tipo_interno, items, gastos=(), ajuste=Ajuste(False), retenciones=()):
+    bruto = sum(it.bruto for it in items)
+    iva = sum(it.iva_importe or 0.0 for it in items)
+    total_gastos = sum(g.importe for g in gastos)
+    iva_gastos = sum(g.iva_importe or 0.0 for g in gastos)
+    return ParsedDoc(
+        filename=filename,
+        cod_arca=cod_arca,
+        letra="A",
+        pv="00003",
+        numero=f"{len(filename):08d}",
+        titulo="LIQUIDACION",
+        fecha="12/03/2024",
+        fecha_operacion="10/03/2024",
+        emisor=CONSIGNATARIA,
+        receptor=PRODUCTOR,
+        tipo_interno=tipo_interno,
+        ajuste=ajuste,
+        importe_bruto=bruto,
+        iva_bruto=iva,
+        total_gastos=total_gastos,
+        iva_gastos=iva_gastos,
+        importe_neto=bruto + iva - total_gastos - iva_gastos,
+        items=list(items),
+        gastos=list(gastos),
+        retenciones=list(retenciones),
+    )
+
+
+def _docs_y_roles():
+    docs = [
+        # 190 subido como EMISOR => VENTA, con gasto y retención
+        _doc(
+            "venta.pdf", 190, "VC",
+            [ItemHacienda("Novillo", 10, 4000, "Kg Vivo", 1000.0, 4_000_000.0, 10.5, 420_000.0)],
+            [Gasto("Comision", None, None, 120_000.0, 21.0, 25_200.0)],
+            retenciones=[("Ret. Ganancias", 1_000.0)],
+        ),
+        # 183 subido como RECEPTOR => COMPRA, gasto sin IVA
+        _doc(
+            "compra.pdf", 183, "LC",
+            [ItemHacienda("Vaca", 5, 0, "Cabeza", 200_000.0, 1_000_000.0, 10.5, 105_000.0)],
+            [Gasto("Flete", None, None, 50_000.0, None, None)],
+        ),
+        # 186 subido como RECEPTOR => VENTA; ajuste físico de crédito: resta montos y cabezas/kilos
+        _doc(
+            "credito.pdf", 186, "CN",
+            [ItemHacienda("Novillo", 2, 800, "Kg Vivo", 1000.0, 800_000.0, 10.5, 84_000.0)],
+            ajuste=Ajuste(True, sentido="CREDITO", tipo="FISICO"),
+        ),
+        # 186 subido como EMISOR => COMPRA; ajuste monetario de débito: suma, sin tocar cabezas/kilos
+        _doc(
+            "debito.pdf", 186, "CD",
+            [ItemHacienda("Ternero", 3, 600, "Kg Vivo", 500.0, 300_000.0, 21.0, 63_000.0)],
+            [Gasto("Comision", None, None, 9_000.0, 21.0, 1_890.0)],
+            ajuste=Ajuste(True, sentido="DEBITO", tipo="MONETARIO"),
+        ),
+        # 180 subido como RECEPTOR => VENTA con alícuotas mixtas (10.5 / 21 / exento)
+        _doc(
+            "mixta.pdf", 180, "CV",
+            [
+                ItemHacienda("Novillo", 4, 1000, "Kg Vivo", 1000.0, 1_000_000.0, 10.5, 105_000.0),
+                ItemHacienda("Toro", 1, 0, "Unidad", 500_000.0, 500_000.0, 21.0, 105_000.0),
+                ItemHacienda("Vaca", 1, 0, "Cabeza", 100_000.0, 100_000.0, 0.0, 0.0),
+            ],
+        ),
+    ]
+    roles = {
+        "venta.pdf": "EMISOR",
+        "compra.pdf": "RECEPTOR",
+        "credito.pdf": "RECEPTOR",
+        "debito.pdf": "EMISOR",
+        "mixta.pdf": "RECEPTOR",
+    }
+    return docs, roles
+
+
+@pytest.fixture(scope="module")
+def out():
+    return build_outputs(*_docs_y_roles())
+
+
+def test_empty_input():
+    res = build_outputs([], {})
+    cols = {
+        "ventas": RESUMEN_COLS,
+        "compras": RESUMEN_COLS,
+        "gastos": GASTOS_COLS,
+        "ctrl_ventas_detalle": CTRL_DETALLE_COLS,
+        "ctrl_compras_detalle": CTRL_DETALLE_COLS,
+        "libro_ventas": LIBRO_VENTAS_COLS,
+        "ventas_salida": EMITIDOS_SALIDA_COLS + ["__bold__"],
+        "compras_gastos_salida": RECIBIDOS_SALIDA_COLS,
+    }
+    for name, expected in cols.items():
+        assert res[name].empty
+        assert list(res[name].columns) == expected
+    # Devuelve copias: modificar una salida no afecta la siguiente llamada
+    res["ventas"].loc[0] = None
+    assert build_outputs([], {})["ventas"].empty
+
+
+def test_ventas_y_compras_por_rol(out):
+    ventas, compras = out["ventas"], out["compras"]
+    assert list(ventas["Tipo"]) == ["VC", "CN", "CV"]
+    assert list(compras["Tipo"]) == ["LC", "CD"]
+    # La contraparte depende sólo del rol de carga
+    assert list(ventas["Contraparte"]) == ["LA PAMPA SA", "CONSIGNATARIA SA", "CONSIGNATARIA SA"]
+    assert list(compras["Contraparte"]) == ["CONSIGNATARIA SA", "LA PAMPA SA"]
+    assert list(ventas["Categoría/Raza"]) == ["Novillo", "Novillo", "Novillo, Toro, Vaca"]
+
+
+def test_ajuste_credito_resta_montos_y_cantidades(out):
+    row = out["ventas"].iloc[1]
+    assert (row["Ajuste"], row["Ajuste sentido"], row["Ajuste tipo"]) == ("SI", "CREDITO", "FISICO")
+    assert (row["Cabezas"], row["Kilos"]) == (-2.0, -800.0)
+    assert (row["Neto Hacienda (sin gastos)"], row["IVA Hacienda"]) == (-800_000.0, -84_000.0)
+
+
+def test_ajuste_debito_monetario_suma_sin_tocar_cantidades(out):
+    row = out["compras"].iloc[1]
+    assert (row["Cabezas"], row["Kilos"]) == (3.0, 600.0)
+    assert (row["Neto Hacienda (sin gastos)"], row["IVA Hacienda"]) == (300_000.0, 63_000.0)
+    assert (row["Gastos (sin IVA)"], row["IVA Gastos"]) == (9_000.0, 1_890.0)
+
+
+def test_libro_ventas_mixta(out):
+    libro = out["libro_ventas"]
+    assert list(libro["Tipo"]) == ["VC", "CN", "CV"]
+    montos = ["Neto 10.5", "IVA 10.5", "Neto 21", "IVA 21", "Exento", "Total"]
+    assert libro.loc[0, montos].tolist() == [4_000_000.0, 420_000.0, 0.0, 0.0, 0.0, 4_420_000.0]
+    assert libro.loc[1, montos].tolist() == [-800_000.0, -84_000.0, 0.0, 0.0, 0.0, -884_000.0]
+    assert libro.loc[2, montos].tolist() == [1_000_000.0, 105_000.0, 500_000.0, 105_000.0, 100_000.0, 1_810_000.0]
+
+
+def test_ventas_salida(out):
+    vs = out["ventas_salida"]
+    # Cada venta seguida de su retención (en negrita, en Otros Conceptos)
+    assert list(vs["Tipo"]) == ["VC", "VC", "CN", "CV"]
+    assert list(vs["__bold__"]) == [False, True, False, False]
+    assert vs.loc[0, ["Neto", "IVA", "Otros Conceptos", "Total"]].tolist() == [4_000_000.0, 420_000.0, 0.0, 4_420_000.0]
+    assert vs.loc[1, ["Neto", "IVA", "Otros Conceptos", "Total"]].tolist() == [0.0, 0.0, 1_000.0, 1_000.0]
+    assert list(vs["Alicuota"]) == [10.5, "", 10.5, 10.5]
+    assert vs.loc[2, "Total"] == -884_000.0
+
+
+def test_compras_gastos_salida(out):
+    rs = out["compras_gastos_salida"]
+    # Por comprobante: 525 (hacienda, sólo COMPRA) y luego 400 (gastos, también de ventas)
+    assert list(rs["Cód. Neto"]) == [400, 525, 400, 525, 400]
+    assert list(rs["Cpbte"]) == ["ND", "LC", "LC", "CD", "CD"]
+    assert list(rs["Movimiento"]) == ["GASTO VENTA", "", "GASTO COMPRA", "", "GASTO COMPRA"]
+    assert rs.loc[1, ["Neto Gravado", "Alíc.", "IVA Liquidado", "Total"]].tolist() == [1_000_000.0, 10.5, 105_000.0, 1_105_000.0]
+    # Gasto sin IVA => exento, a Conceptos NG/EX
+    assert rs.loc[2, ["Neto Gravado", "Cód. NG/EX", "Conceptos NG/EX", "Total"]].tolist() == ["", 400, 50_000.0, 50_000.0]
+    assert rs.loc[4, ["Neto Gravado", "Alíc.", "IVA Liquidado", "Total"]].tolist() == [9_000.0, 21.0, 1_890.0, 10_890.0]
+
+
+def test_gastos_detalle(out):
+    gastos = out["gastos"]
+    assert list(gastos["Concepto"]) == ["Comision", "Flete", "Comision"]
+    assert list(gastos["Movimiento"]) == ["VENTA", "COMPRA", "COMPRA"]
+    assert list(gastos["IVA %"]) == [21.0, "", 21.0]
+    assert list(gastos["IVA $"]) == [25_200.0, "", 1_890.0]
+
+
+def test_control_hacienda(out):
+    det, res = out["ctrl_ventas_detalle"], out["ctrl_ventas_resumen"]
+    assert list(det["Cantidad (Cabezas)"]) == [10, -2, 4, 1, 1]
+    novillo = res.loc[res["Tipo de Hacienda"] == "Novillo"].iloc[0]
+    assert (novillo["Cantidad (Cabezas)"], novillo["Kilos"]) == (12, 4200.0)
+    assert novillo["Monto Bruto (sin gastos)"] == 4_200_000.0
+    assert novillo["Precio ($ UM)"] == 1000.0
+    compras = out["ctrl_compras_resumen"]
+    # Resumen ordenado por (Tipo, UM), igual que la planilla exportada
+    assert list(compras["Tipo de Hacienda"]) == ["Ternero", "Vaca"]
+    assert list(compras["Cantidad (Cabezas)"]) == [3, 5]
+
+
+def test_control_hacienda_resumen_no_depende_del_orden_de_carga(out):
+    docs, roles = _docs_y_roles()
+    invertido = build_outputs(docs[::-1], roles)
+    for name in ("ctrl_ventas_resumen", "ctrl_compras_resumen"):
+        assert invertido[name].equals(out[name])
+    assert list(out["ctrl_ventas_resumen"]["Tipo de Hacienda"]) == ["Novillo", "Toro", "Vaca"]
+
+
+def test_reduce_items_numpy_matches_loop():
+    rng = np.random.default_rng(0)
+    n, k = 7, 40
+    item_doc = np.sort(rng.integers(0, n - 1, k)).astype(np.int32)  # el último doc sin items
+    iva_pct = rng.choice([np.nan, 0.0, 10.5, 21.0], k)
+    args = (
+        item_doc,
+        n,
+        rng.integers(0, 50, k).astype(float),
+        rng.uniform(0, 5000, k),
+        rng.uniform(0, 1e6, k),
+        rng.uniform(0, 1e5, k),
+        iva_pct,
+        rng.choice([-1.0, 1.0], n),
+        rng.choice([-1.0, 1.0], n),
+        rng.choice([0.0, 10.5, 21.0], n),
+    )
+    np.testing.assert_allclose(_reduce_items_numpy(*args), _reduce_items_loop(*args), rtol=1e-12)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from src.rules import (
+    condicion_iva_abreviar,
+    detectar_ajuste,
+    movimiento_por_regla,
+    movimiento_por_regla_vec,
+    tipo_interno_por_cod,
+)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("LIQUIDACION DE COMPRA DIRECTA", (False, None, None, 1, False)),
+    ("Ajuste Físico Crédito", (True, "CREDITO", "FISICO", -1, True)),
+    ("AJUSTE FISICO DEBITO", (True, "DEBITO", "FISICO", 1, True)),
+    ("ajuste financiero crédito", (True, "CREDITO", "MONETARIO", -1, False)),
+    ("Ajuste Monetario", (True, None, "MONETARIO", 1, False)),
+    ("AJUSTE\nCRÉDITO", (True, "CREDITO", None, -1, False)),
+    ("Nota de Crédito sin ajuste", (True, "CREDITO", None, -1, False)),
+    # Crédito tiene prioridad sobre débito
+    ("AJUSTE DÉBITO Y CRÉDITO", (True, "CREDITO", None, -1, False)),
+    # El tipo sólo cuenta pegado a AJUSTE con un espacio
+    ("Ajuste  Físico crédito", (True, "CREDITO", None, -1, False)),
+])
+def test_detectar_ajuste(texto, esperado):
+    aj = detectar_ajuste(texto)
+    assert (aj.es_ajuste, aj.sentido, aj.tipo, aj.signo_montos, aj.afecta_cabezas_kilos) == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("IVA Responsable Inscripto", "RI"),
+    ("Responsable Monotributo", "MT"),
+    ("Monotributo Responsable Inscripto", "MT"),
+    ("EXENTO", "EX"),
+    ("IVA RESP", "RI"),
+    ("IVA Responsable", "RI"),
+    ("resp inscripto", ""),
+    ("Consumidor Final", ""),
+    ("", ""),
+    (None, ""),
+])
+def test_condicion_iva_abreviar(texto, esperado):
+    assert condicion_iva_abreviar(texto) == esperado
+
+
+def test_movimiento_por_regla_vec_igual_al_escalar():
+    cods = np.array([186, 188, 180, 183, 185, 190, 191, 0, 999, 186])
+    roles = np.array(["EMISOR", "RECEPTOR"] * 5, dtype=object)
+    esperado = [movimiento_por_regla(int(c), r) for c, r in zip(cods, roles)]
+    assert movimiento_por_regla_vec(cods, roles).tolist() == esperado
+    assert movimiento_por_regla_vec(np.array([], dtype=np.int64), np.array([], dtype=object)).tolist() == []
+
+
+def test_tipo_interno_por_cod():
+    assert tipo_interno_por_cod(186, "LIQUIDACION") == "CD"
+    assert tipo_interno_por_cod(186, "Ajuste Físico Crédito") == "CN"
+    assert tipo_interno_por_cod(180, "AJUSTE CREDITO") == "LA"
+    assert tipo_interno_por_cod(183, "ajuste crédito") == "LN"
+    assert tipo_interno_por_cod(190, "AJUSTE DEBITO") == "VC"
+    assert tipo_interno_por_cod(1, "") == "OTRO"